@@ -0,0 +1,58 @@
+import math
+
+from replication import SUMMARY_METRICS, summarize
+
+# ------------------------ АНАЛИЗ ------------------------
+# numpy и pandas импортируются только внутри функций, которым они нужны
+
+
+def mean_ci(vals):
+    n = len(vals)
+    m = sum(vals) / n
+    if n <= 1:
+        return m, m, m
+    s = (sum((v - m) ** 2 for v in vals) / (n - 1)) ** 0.5
+    h = 1.96 * s / (n ** 0.5)
+    return m, m - h, m + h
+
+
+def summary_rows(runs):
+    return [summarize(r) for r in runs]
+
+
+def summary_frame(runs):
+    # df_summary: одна строка на реплику
+    import pandas as pd
+
+    return pd.DataFrame(summary_rows(runs))
+
+
+def aggregate_metrics(rows):
+    # "<метрика>_mean_ci" -> (среднее, нижняя, верхняя граница); NaN (нет завершённых заказов) пропускаются
+    metrics = {}
+    for name in SUMMARY_METRICS:
+        vals = [r[name] for r in rows if not math.isnan(r[name])]
+        metrics[f"{name}_mean_ci"] = mean_ci(vals) if vals else (math.nan,) * 3
+    return metrics
+
+
+def format_metrics(metrics):
+    lines = ["Aggregated metrics (mean, 95% CI):"]
+    for k, (m, l, u) in metrics.items():
+        lines.append(f"{k}: mean={m:.4f}, CI=[{l:.4f}, {u:.4f}]")
+    return "\n".join(lines)
+
+
+def run_end_time(rep):
+    # фактический конец событий в реплике (по рядам занятости)
+    return max(max((rep[k].times[-1] for k in ("busy_trucks", "busy_loaders", "bulldozer_busy") if len(rep[k])), default=0.0), 1.0)
+
+
+def series_from_event_list(event_list, grid):
+    # значение ступенчатого ряда в точках сетки (до первого события — 0)
+    import pandas as pd
+
+    from resample import as_step_arrays, step_values_at
+
+    times, values = as_step_arrays(event_list)
+    return pd.Series(step_values_at(times, values, grid), index=grid)
@@ -0,0 +1,323 @@
+import math
+
+from replication import SUMMARY_METRICS
+from simulator import UNLOAD_TIME, resources_from_params
+
+# ------------------------ АНАЛИТИЧЕСКАЯ ОЦЕНКА ------------------------
+# Приближённая модель площадки для отбора сценариев до моделирования (около 0.1-0.2 мс
+# на конфигурацию против секунд на реплики).
+#
+# Самосвалы — замкнутая сеть: очередь к погрузчикам (c каналов) и «бесконечный» узел
+# задержки Z = travel_time_mean + UNLOAD_TIME. Освободившийся погрузчик в модели ждёт
+# следующего события (loading_done не запускает новую погрузку), в среднем до следующей
+# готовой кучи: к времени узла погрузки добавляется heap_formation_mean / b, когда есть очередь.
+# Пропускная способность сети X_net(N) — MVA по числу самосвалов N, многоканальный узел —
+# по Зейдману (один канал S/c плюс задержка S(c-1)/c). Бульдозеры дают кучи с темпом
+# b / heap_formation_mean, рейс забирает 2 кучи: мощность C = min(X_net, b / (2 hfm)).
+#
+# Заказ получает самосвалы, пока не доставлено нужное число куч (а не пока не назначено),
+# поэтому на него уходит больше рейсов, чем ceil(required / 2): он стоит первым в очереди
+# до k-го возвращения, а самосвалы всё это время отправляются к нему с темпом r.
+# Время T_k до k-го возвращения считается по пуассоновскому приближению числа
+# вернувшихся: mu(t) = n0 F(t) + r * интеграл F, F — распределение рейса
+# (разгрузка + погрузка + дорога). Рейсов на заказ: min(n0 + r E[T_k], N + k - 1).
+#
+# Поток заказов — пуассоновский. При rho = E[T_k] / interarrival < 1 время подготовки —
+# M/G/1 (Поллачек — Хинчин) с длительностью обслуживания T_k, иначе — жидкостная модель
+# растущей очереди на конечном горизонте SIM_TIME.
+#
+# Точность (сверка validate с репликами): рейсы и завершённые заказы — единицы процентов.
+# Время подготовки при перегрузке завышается на 25-35%, загрузка погрузчиков и самосвалов
+# в малых парках (2 самосвала, короткие рейсы) может ошибаться в разы: очередь к погрузчику
+# и простои там не описываются MVA. Поэтому отбор (prescreen) — только по пропускным метрикам.
+
+# required ~ randint(3, 7): доставки идут по 2 кучи -> нужно ceil(r / 2) возвращений
+TRIPS_NEEDED = [math.ceil(r / 2) for r in range(3, 8)]
+
+
+def mva_throughput(n_trucks, loaders, service, delay):
+    # пропускная способность замкнутой сети (рейсы в единицу времени), точный MVA
+    # для одноканального узла + задержки; многоканальный узел — приближение Зейдмана
+    if n_trucks <= 0 or loaders <= 0:
+        return 0.0
+    s = service / loaders
+    z = delay + service * (loaders - 1) / loaders
+    q = 0.0
+    x = 0.0
+    for n in range(1, n_trucks + 1):
+        r = s * (1.0 + q)
+        x = n / (r + z)
+        q = x * r
+    return x
+
+
+class TripTime:
+    # длительность рейса D = shift + X + Y, X и Y — экспоненциальные со средними m1, m2
+    # (детерминированные части входят в shift); F — функция распределения, G — её интеграл
+    def __init__(self, load, travel, stochastic_loading, stochastic_travel):
+        self.shift = UNLOAD_TIME + (0.0 if stochastic_loading else load) + (0.0 if stochastic_travel else travel)
+        self.means = [m for m, stochastic in ((load, stochastic_loading), (travel, stochastic_travel)) if stochastic and m > 0]
+        if len(self.means) == 2 and abs(self.means[0] - self.means[1]) < 1e-9 * self.means[0]:
+            self.means[1] *= 1.0 + 1e-6  # равные средние: предел через близкие значения
+        self.mean = self.shift + sum(self.means)
+
+    def cdf(self, t):
+        u = t - self.shift
+        if u < 0:
+            return 0.0
+        if not self.means:
+            return 1.0
+        if len(self.means) == 1:
+            return 1.0 - math.exp(-u / self.means[0])
+        m1, m2 = self.means
+        return 1.0 - (m1 * math.exp(-u / m1) - m2 * math.exp(-u / m2)) / (m1 - m2)
+
+    def integral(self, t):
+        # интеграл cdf от 0 до t
+        u = t - self.shift
+        if u <= 0:
+            return 0.0
+        if not self.means:
+            return u
+        if len(self.means) == 1:
+            m = self.means[0]
+            return u - m * (1.0 - math.exp(-u / m))
+        m1, m2 = self.means
+        return u - (m1 * m1 * (1.0 - math.exp(-u / m1)) - m2 * m2 * (1.0 - math.exp(-u / m2))) / (m1 - m2)
+
+
+def _gauss_legendre(n):
+    # узлы и веса квадратуры Гаусса — Лежандра на [-1, 1] (итерации Ньютона по корням P_n)
+    nodes = []
+    for i in range(1, n + 1):
+        x = math.cos(math.pi * (i - 0.25) / (n + 0.5))
+        for _ in range(100):
+            p0, p1 = 1.0, x
+            for j in range(2, n + 1):
+                p0, p1 = p1, ((2 * j - 1) * x * p1 - (j - 1) * p0) / j
+            dp = n * (x * p1 - p0) / (x * x - 1.0)
+            dx = p1 / dp
+            x -= dx
+            if abs(dx) < 1e-15:
+                break
+        nodes.append((x, 2.0 / ((1.0 - x * x) * dp * dp)))
+    return nodes
+
+
+GAUSS_NODES = _gauss_legendre(8)
+TRANSIENT_MEANS = 10.0  # после shift + 10 средних экспонент F(t) отличается от 1 меньше чем на 5e-5
+
+
+def _below(mu, kmax):
+    # [P(N < k) for k = 0 .. kmax], N ~ Пуассон(mu)
+    out = [0.0] * (kmax + 1)
+    term = math.exp(-mu)
+    cum = 0.0
+    for j in range(kmax):
+        cum += term
+        out[j + 1] = cum
+        term *= mu / (j + 1)
+    return out
+
+
+def completion_times(ks, rate, n0, trip, panels=3):
+    # E[T_k] для всех k из ks: n0 самосвалов отправлены в момент 0, дальше — с темпом rate;
+    # E[T_k] = интеграл P(T_k > t) dt = интеграл P(Пуассон(mu(t)) < k) dt, mu(t) = n0 F(t) + r G(t).
+    # До trip.shift никто не вернулся (вклад shift), переходный участок — квадратура Гаусса,
+    # дальше F = 1 и mu(t) = mu_b + r (t - b) линейна: хвост в замкнутом виде,
+    # интеграл P(Пуассон(m) < k) dm от m_b до бесконечности = сумма P(Пуассон(m_b) < i), i = 1 .. k
+    kmax = max(ks)
+    totals = [trip.shift] * (kmax + 1)
+    start = trip.shift
+    end = start + TRANSIENT_MEANS * max(trip.means, default=0.0)
+    if end > start:
+        width = (end - start) / panels
+        for p in range(panels):
+            mid = start + (p + 0.5) * width
+            for x, w in GAUSS_NODES:
+                t = mid + 0.5 * width * x
+                below = _below(n0 * trip.cdf(t) + rate * trip.integral(t), kmax)
+                for k in range(1, kmax + 1):
+                    totals[k] += 0.5 * width * w * below[k]
+    below = _below(n0 * trip.cdf(end) + rate * trip.integral(end), kmax)
+    out = {}
+    for k in ks:
+        tail = sum(below[1 : k + 1])
+        if rate > 0:
+            out[k] = totals[k] + tail / rate
+        else:
+            out[k] = totals[k] if tail < 1e-12 else math.inf
+    return out
+
+
+def order_service(rate, n0, n_trucks, trip):
+    # по k из TRIPS_NEEDED: (E[T_k], рейсов на заказ)
+    times = completion_times(set(TRIPS_NEEDED), rate, n0, trip)
+    return [(times[k], max(k, min(n0 + rate * times[k], n_trucks + k - 1))) for k in TRIPS_NEEDED]
+
+
+def predict(params):
+    # оценка показателей одного сценария; ключи сводки те же, что у replication.summarize
+    res = resources_from_params(params)
+    n, c, b = res["trucks"], res["loaders"], res["bulldozer"]
+    load = float(params["loading_time_mean"])
+    travel = float(params["travel_time_mean"])
+    hfm = float(params["heap_formation_mean"])
+    cycle = load + travel + UNLOAD_TIME  # время занятости самосвала за рейс
+    sim_time = float(params["SIM_TIME"])
+    max_orders = int(params["MAX_ORDERS"])
+    ia = float(params["order_interarrival_mean"])
+    if n <= 0 or c <= 0 or b <= 0:
+        return _empty_prediction(params, "fleet" if b else "heaps", 0.0)
+
+    # ожидание кучи после погрузки важно, только если к погрузчику стоит очередь:
+    # S = L + (hfm / b) * rho^c, rho — загрузка узла; решается простой итерацией
+    station = load
+    for _ in range(20):
+        x_net = mva_throughput(n, c, station, travel + UNLOAD_TIME)
+        rho_station = min(1.0, x_net * station / c)
+        station = load + hfm / b * rho_station**c
+    heap_rate = b / (2.0 * hfm)
+    capacity = min(x_net, heap_rate)
+    trip = TripTime(load, travel, params["stochastic_loading"], params["stochastic_travel"])
+
+    # заказы идут подряд: новый заказ встаёт первым, когда самосвалы заняты прежним
+    backlog = order_service(capacity, 0, n, trip)
+    head_time = sum(t for t, _ in backlog) / len(backlog)
+    rho = head_time / ia
+    if rho < 1.0:
+        # заказ приходит к простаивающим самосвалам и запасу куч
+        fresh = order_service(x_net, min(c, n), n, trip)
+        mean_s = sum(t for t, _ in fresh) / len(fresh)
+        second = sum(t * t for t, _ in fresh) / len(fresh)
+        trips_per_order = sum(m for _, m in fresh) / len(fresh)
+        prep = (1.0 / ia) * second / (2.0 * (1.0 - min(mean_s / ia, 0.99))) + mean_s
+        completed = min(max_orders, max(0, math.floor((sim_time - prep) / ia) + 1))
+        mean_prep = prep if completed else math.nan
+        stop = (max_orders - 1) * ia + prep
+        trips = min(capacity * sim_time, trips_per_order * min(max_orders, sim_time / ia))
+    else:
+        # очередь растёт: заказы уходят с головы очереди с темпом capacity / рейсов на заказ,
+        # заказ j готов примерно в (j + 1) * head_time
+        trips_per_order = sum(m for _, m in backlog) / len(backlog)
+        head_time = trips_per_order / capacity
+        completed = min(max_orders, max(0, math.floor(sim_time / head_time)))
+        mean_prep = head_time + (head_time - ia) * (completed - 1) / 2.0 if completed else math.nan
+        stop = max_orders * head_time
+        trips = capacity * min(sim_time, stop)
+    active = min(sim_time, stop)
+    # после остановки (все заказы готовы) занятость до SIM_TIME замирает в текущем
+    # состоянии: при перегрузке это обычная загрузка, при недогрузке — лишние рейсы в пути
+    if rho >= 1.0:
+        loaders_util = capacity * load / c
+        trucks_util = capacity * cycle / n
+    else:
+        frozen = min(float(n), max(0.0, trips_per_order - sum(TRIPS_NEEDED) / len(TRIPS_NEEDED)))
+        loaders_util = (trips * load) / (c * sim_time)
+        trucks_util = (trips * cycle + frozen * (sim_time - active)) / (n * sim_time)
+
+    if rho < 1.0:
+        bottleneck = "orders"
+    elif x_net <= heap_rate:
+        bottleneck = "loaders" if x_net * station / c > 0.9 else "trucks"
+    else:
+        bottleneck = "heaps"
+
+    return {
+        "delivered_heaps": 4.0 * trips,  # как в модели: +2 по прибытии и +2 по возвращении
+        "trips": trips,
+        "orders_completed": float(completed),
+        "avg_prep_time": mean_prep,
+        "bulldozer_util": 1.0,
+        "loaders_util": min(1.0, loaders_util),
+        "trucks_util": min(1.0, trucks_util),
+        "throughput": trips / active if active > 0 else 0.0,
+        "capacity": capacity,
+        "rho": rho,
+        "trips_per_order": trips_per_order,
+        "bottleneck": bottleneck,
+    }
+
+
+def _empty_prediction(params, bottleneck, capacity):
+    out = {m: 0.0 for m in SUMMARY_METRICS}
+    out.update(
+        avg_prep_time=math.nan,
+        bulldozer_util=1.0 if resources_from_params(params)["bulldozer"] else 0.0,
+        throughput=0.0,
+        capacity=capacity,
+        rho=math.inf,
+        trips_per_order=math.nan,
+        bottleneck=bottleneck,
+    )
+    return out
+
+
+# ------------------------ ОТБОР СЦЕНАРИЕВ ДЛЯ SWEEP ------------------------
+# метрики, по которым оценка достаточно точна для отбора сценариев
+PRESCREEN_METRICS = ("trips", "delivered_heaps", "orders_completed", "throughput", "capacity")
+
+
+def prescreen(metric="trips", keep_fraction=0.25, margin=0.1, maximize=True, min_keep=1):
+    # функция для sweep.run_sweep(prescreen=...): по списку сценариев -> список bool.
+    # Оставляет долю keep_fraction лучших по оценке metric и всё, что хуже порога
+    # не более чем на margin (запас на ошибку приближения)
+    if metric not in PRESCREEN_METRICS:
+        raise ValueError(f"prescreen metric must be one of {PRESCREEN_METRICS}, got {metric!r}")
+    def keep(scenarios):
+        scores = [predict(p)[metric] for p in scenarios]
+        if not maximize:
+            scores = [-s for s in scores]
+        valid = sorted((s for s in scores if not math.isnan(s)), reverse=True)
+        if not valid:
+            return [True] * len(scenarios)
+        k = max(min_keep, math.ceil(keep_fraction * len(scenarios)))
+        threshold = valid[min(k, len(valid)) - 1]
+        cut = threshold - margin * abs(threshold)
+        return [math.isnan(s) or s >= cut for s in scores]
+
+    return keep
+
+
+# ------------------------ ПРОВЕРКА ПО МОДЕЛИРОВАНИЮ ------------------------
+def validate(base_params, points, n_replications=10, master_seed=None, workers=1, metrics=SUMMARY_METRICS):
+    # для каждой точки и метрики: оценка, среднее по репликам с 95% ДИ, относительная ошибка
+    from sweep import run_sweep
+
+    sweep = run_sweep(base_params, points, n_replications, master_seed=master_seed, workers=workers)
+    rows = []
+    for res in sweep["results"]:
+        pred = predict({**base_params, **res["point"]})
+        for m in metrics:
+            mean, lo, hi = res["metrics"][m]
+            p = pred[m]
+            rel = abs(p - mean) / abs(mean) if mean else (0.0 if p == 0 else math.inf)
+            rows.append(
+                {
+                    "point": res["point"],
+                    "metric": m,
+                    "predicted": p,
+                    "simulated": mean,
+                    "ci": (lo, hi),
+                    "rel_error": rel,
+                    "bottleneck": pred["bottleneck"],
+                }
+            )
+    return rows
+
+
+def validation_report(rows):
+    lines = [f"{'point':<40}{'metric':<18}{'predicted':>12}{'simulated':>12}{'rel.err':>9}"]
+    for r in rows:
+        point = ", ".join(f"{k}={v}" for k, v in r["point"].items())
+        lines.append(
+            f"{point:<40}{r['metric']:<18}{r['predicted']:>12.4g}{r['simulated']:>12.4g}{r['rel_error']:>9.1%}"
+        )
+    errors = {}
+    for r in rows:
+        if not math.isnan(r["rel_error"]) and not math.isinf(r["rel_error"]):
+            errors.setdefault(r["metric"], []).append(r["rel_error"])
+    lines.append("")
+    medians = ", ".join(f"{m}={sorted(v)[len(v) // 2]:.1%}" for m, v in errors.items())
+    lines.append(f"median relative error: {medians}")
+    return "\n".join(lines)
@@ -0,0 +1,94 @@
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event import Event  # noqa: E402
+from fel import EVENT_LISTS  # noqa: E402
+from simulator import Simulation  # noqa: E402
+
+# ------------------------ HOLD-МОДЕЛЬ ------------------------
+# классический тест списка событий: N ожидающих событий, каждое извлечение
+# планирует новое событие через экспоненциальную задержку (часть — с нулевой)
+#
+# Результат на CPython: календарная очередь медленнее кучи при всех проверенных размерах
+# (10 .. 100 000 ожидающих; при 100 000 — примерно на 15%, в самой модели — на ~30%).
+# heapq написан на C, а у календаря O(1) достигается Python-кодом; выигрыш даёт кортежное
+# событие и полоса нулевых задержек (legacy -> heap), а не смена структуры.
+
+
+class LegacyHeap:
+    # прежняя схема: объект Event на каждое событие + heapq со сравнением через __lt__
+    name = "legacy"
+
+    def __init__(self):
+        self.events = []
+
+    def push(self, time, event_type, func, args=()):
+        heapq.heappush(self.events, Event(time, event_type, func, *args))
+
+    def pop(self):
+        ev = heapq.heappop(self.events)
+        return ev.time, ev.seq, ev.type, ev.func, ev.args
+
+
+def hold(make, pending, ops, zero_share, seed=0):
+    rng = random.Random(seed)
+    q = make()
+    for _ in range(pending):
+        q.push(rng.expovariate(1.0), "hold", None)
+    start = time.perf_counter()
+    for _ in range(ops):
+        t = q.pop()[0]
+        delay = 0.0 if rng.random() < zero_share else rng.expovariate(1.0)
+        q.push(t + delay, "hold", None)
+    return ops / (time.perf_counter() - start)
+
+
+def simulation_rate(kind, sim_time, max_orders, seed=0):
+    params = {
+        "SIM_TIME": sim_time,
+        "MAX_ORDERS": max_orders,
+        "heap_formation_mean": 5,
+        "order_interarrival_mean": 50,
+        "loading_time_mean": 10,
+        "travel_time_mean": 40,
+        "stochastic_loading": True,
+        "stochastic_travel": True,
+        "tracing": False,
+        "record_history": False,
+        "event_list": kind,
+    }
+    sim = Simulation(params, rng=random.Random(seed))
+    start = time.perf_counter()
+    sim.start()
+    return sim.events.scheduled / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="events/second for each future event list")
+    ap.add_argument("--ops", type=int, default=200_000)
+    ap.add_argument("--pending", type=int, nargs="+", default=[10, 1_000, 100_000])
+    ap.add_argument("--zero-share", type=float, default=0.3)
+    args = ap.parse_args(argv)
+
+    makers = {"legacy": LegacyHeap, **EVENT_LISTS}
+    print(f"hold model, {args.ops} ops, zero-delay share {args.zero_share}")
+    print(f"{'pending':>10} " + " ".join(f"{name:>12}" for name in makers) + f" {'fastest':>12}")
+    for n in args.pending:
+        rates = dict(zip(makers, (hold(make, n, args.ops, args.zero_share) for make in makers.values())))
+        fastest = max(rates, key=rates.get)
+        print(f"{n:>10} " + " ".join(f"{r:>12,.0f}" for r in rates.values()) + f" {fastest:>12}")
+
+    print("\nSimulation.start, events/s (SIM_TIME=1e6, MAX_ORDERS=1e6)")
+    rates = {kind: simulation_rate(kind, 1_000_000, 1_000_000) for kind in EVENT_LISTS}
+    for kind, rate in rates.items():
+        print(f"{kind:>10} {rate:>12,.0f} ({rate / rates['heap']:.2f} x heap)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replication import run_replications, summarize  # noqa: E402
+from simulator import Simulation  # noqa: E402
+
+# ------------------------ НАБОР ЗАМЕРОВ ------------------------
+# Каждый замер — функция без аргументов, возвращающая словарь метрик; главная метрика —
+# "seconds" (меньше — лучше), по ней и ищется регрессия относительно базовой линии.
+# Время — минимум из repeats повторов (минимум устойчивее к шуму, чем среднее),
+# пиковая память — отдельным прогоном под tracemalloc, чтобы не искажать время.
+# Всё детерминировано (фиксированные зёрна) и не требует сети.
+# базовая линия в репозитории снята на одной машине (см. "meta"); на другой её стоит
+# пересохранить через --save-baseline перед сравнением
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 10.0  # %, насколько замер может быть медленнее базовой линии
+
+BASE_PARAMS = {
+    "SIM_TIME": 100_000,
+    "MAX_ORDERS": 2_000,
+    "n_bulldozers": 1,
+    "n_loaders": 2,
+    "n_trucks": 4,
+    "heap_formation_mean": 5,
+    "order_interarrival_mean": 50,
+    "loading_time_mean": 10,
+    "travel_time_mean": 40,
+    "stochastic_loading": True,
+    "stochastic_travel": True,
+    "tracing": False,
+    "seed": 12345,
+}
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def simulation_case(params, repeats):
+    def run():
+        sim = Simulation(params, rng=random.Random(params["seed"]))
+        sim.start()
+        return sim.events.scheduled - len(sim.events)
+
+    seconds, events = timed(run, repeats)
+    return {
+        "seconds": seconds,
+        "events": events,
+        "events_per_second": events / seconds,
+        "peak_mb": peak_memory(run) / 2**20,
+    }
+
+
+def replication_case(params, n, workers, repeats):
+    seconds, _ = timed(lambda: run_replications(params, n=n, workers=workers), repeats)
+    return {"seconds": seconds, "workers": workers, "replications_per_second": n / seconds}
+
+
+def postprocess_case(params, n, repeats):
+    # то, что делает анализ в newone: сводки реплик, сетка, скользящее среднее по времени,
+    # средние по интервалам для всех реплик сразу
+    import numpy as np
+
+    from resample import as_step_arrays, batch_time_weighted_bins, sliding_time_average, step_values_at
+
+    runs = run_replications(params, n=n, workers=1)
+    end = float(params["SIM_TIME"])
+
+    def run():
+        rows = [summarize(r) for r in runs]
+        grid = np.linspace(0.0, end, 1000)
+        for key in ("busy_trucks", "busy_loaders", "bulldozer_busy"):
+            times, values = as_step_arrays(runs[0][key])
+            step_values_at(times, values, grid)
+            sliding_time_average(times, values, grid, 50.0)
+            batch_time_weighted_bins([r[key] for r in runs], np.linspace(0.0, end, 201))
+        return rows
+
+    seconds, _ = timed(run, repeats)
+    points = sum(len(r["busy_trucks"]) for r in runs)
+    return {"seconds": seconds, "series_points": points, "points_per_second": points / seconds}
+
+
+def cases(quick=False):
+    # имя замера -> функция; имена стабильны, по ним сопоставляется базовая линия
+    repeats = 3
+    sim_times = (10_000, 100_000) if quick else (10_000, 100_000, 1_000_000)
+    max_orders = (200, 2_000) if quick else (200, 2_000, 20_000)
+    fleets = (2, 4, 8) if quick else (2, 4, 8, 16)
+    out = {}
+    for sim_time in sim_times:
+        p = dict(BASE_PARAMS, SIM_TIME=sim_time, MAX_ORDERS=10**9)
+        out[f"sim/SIM_TIME={sim_time}"] = lambda p=p: simulation_case(p, repeats)
+    for m in max_orders:
+        p = dict(BASE_PARAMS, SIM_TIME=10**9, MAX_ORDERS=m)
+        out[f"sim/MAX_ORDERS={m}"] = lambda p=p: simulation_case(p, repeats)
+    for trucks in fleets:
+        p = dict(BASE_PARAMS, n_trucks=trucks, n_loaders=max(1, trucks // 2))
+        out[f"sim/n_trucks={trucks}"] = lambda p=p: simulation_case(p, repeats)
+    p = dict(BASE_PARAMS, streaming_stats=True)
+    out["sim/streaming_stats"] = lambda p=p: simulation_case(p, repeats)
+
+    # объём работы входит в имя замера: быстрый прогон не сравнивается с полным.
+    # Параллельные замеры есть всегда, даже если процессоров меньше, — путь через пул
+    # процессов проверяется на любой машине (масштабирование видно только на многоядерной)
+    n_reps = 8 if quick else 32
+    cpus = os.cpu_count() or 1
+    for workers in sorted({1, 2, 4, cpus}):
+        out[f"replications/n={n_reps}/workers={workers}"] = lambda w=workers: replication_case(BASE_PARAMS, n_reps, w, 1)
+
+    out[f"postprocess/newone/n={n_reps}"] = lambda: postprocess_case(BASE_PARAMS, n_reps, repeats)
+    return out
+
+
+def run_suite(quick=False, only=None):
+    results = {}
+    for name, fn in cases(quick).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = fn()
+        print(f"{name:<32} {results[name]['seconds']:>10.4f} s", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+        },
+        "cases": results,
+    }
+
+
+# ------------------------ СРАВНЕНИЕ С БАЗОВОЙ ЛИНИЕЙ ------------------------
+def unmatched(current, baseline, only=None):
+    # -> (замеры без базовой линии, замеры базовой линии, не попавшие в прогон);
+    # при only учитываются только выбранные префиксы
+    now = set(current.get("cases", {}))
+    base = {
+        name
+        for name in baseline.get("cases", {})
+        if not only or any(name.startswith(prefix) for prefix in only)
+    }
+    return sorted(now - base), sorted(base - now)
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    # -> список (имя, время сейчас, время в базовой линии, изменение в %) для замеров,
+    # ставших медленнее более чем на threshold %; замеры без пары здесь не сравниваются —
+    # их находит unmatched
+    regressions = []
+    base_cases = baseline.get("cases", {})
+    for name, res in current.get("cases", {}).items():
+        base = base_cases.get(name)
+        if base is None or not base.get("seconds"):
+            continue
+        change = (res["seconds"] / base["seconds"] - 1.0) * 100.0
+        if change > threshold:
+            regressions.append((name, res["seconds"], base["seconds"], change))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="simulator throughput and scaling benchmarks")
+    ap.add_argument("--quick", action="store_true", help="smaller grid (about a minute)")
+    ap.add_argument("--only", nargs="+", help="run cases whose names start with these prefixes")
+    ap.add_argument("--output", help="write results as JSON")
+    ap.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    ap.add_argument("--save-baseline", action="store_true", help="store results as the new baseline")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, %%")
+    args = ap.parse_args(argv)
+
+    current = run_suite(args.quick, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        # без базовой линии проверка ничего не проверяет — это ошибка, а не «нет регрессий»
+        print(f"no baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("quick", False) != args.quick:
+        print(
+            f"baseline {args.baseline} was recorded with quick={baseline.get('meta', {}).get('quick')}, "
+            f"this run has quick={args.quick}; not comparing",
+            file=sys.stderr,
+        )
+        return 2
+    # базовая линия имеет смысл только на той же машине и версии Python
+    base_meta = baseline.get("meta", {})
+    for key in ("python", "implementation", "machine", "cpu_count"):
+        if key in base_meta and base_meta[key] != current["meta"][key]:
+            print(f"warning: baseline {key}={base_meta[key]!r}, current {current['meta'][key]!r}")
+    regressions = compare(current, baseline, args.threshold)
+    for name, now, before, change in regressions:
+        print(f"REGRESSION {name}: {now:.4f} s vs {before:.4f} s (+{change:.1f}%)")
+    # замер без пары не проверен: это ошибка, а не «нет регрессий»
+    new_cases, missing_cases = unmatched(current, baseline, args.only)
+    for name in new_cases:
+        print(f"UNMATCHED {name}: not in the baseline", file=sys.stderr)
+    for name in missing_cases:
+        print(f"UNMATCHED {name}: in the baseline but not run", file=sys.stderr)
+    if regressions:
+        return 1
+    if new_cases or missing_cases:
+        return 2
+    print(f"no regressions over {args.threshold:.0f}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
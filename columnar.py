@@ -0,0 +1,333 @@
+import bisect
+import json
+import os
+import struct
+import sys
+from array import array
+
+from replication import (
+    SUMMARY_METRICS,
+    replication_rng,
+    replication_variates,
+    resolve_master_seed,
+    resolve_workers,
+    summarize,
+)
+from simulator import MODEL_VERSION, STATE_CHANNELS, Simulation
+
+# ------------------------ КОЛОНОЧНОЕ ХРАНИЛИЩЕ РЕЗУЛЬТАТОВ ------------------------
+# Результаты реплик пишутся на диск по ходу прогона, а читаются отображением в память
+# (numpy.load(mmap_mode="r")) без копирования и без загрузки всего в RAM.
+#
+# root/index.json            — параметры, главное зерно, список частей, длины колонок
+# root/part-000/<колонка>.npy — обычные .npy-файлы (одна колонка — один одномерный массив):
+#   replication, summary.<метрика>         — строка на реплику
+#   prep_time, prep_time.offsets            — времена подготовки всех реплик подряд;
+#                                             реплика i — [offsets[i], offsets[i + 1])
+#   <ряд>.t, <ряд>.v, <ряд>.offsets         — ступенчатые ряды занятости так же
+# Каждый процесс пишет свою часть (реплики подряд), поэтому записи не пересекаются.
+# Запись не требует numpy: данные идут прямо из буферов array, заголовок .npy фиксированного
+# размера дописывается длиной при закрытии.
+
+FORMAT = "columnar/1"
+INDEX = "index.json"
+HEADER_SIZE = 128  # заголовок .npy, кратный 64 байтам: данные выровнены
+DEFAULT_WINDOWS = 64  # окон run_iter на прогон: после каждого новые точки уходят на диск
+SERIES_KEYS = tuple(STATE_CHANNELS)
+# счётчики хранятся целыми ("q"): сводки из хранилища те же, что из памяти (208, а не 208.0)
+INTEGER_METRICS = ("delivered_heaps", "trips", "orders_completed")
+
+
+def _descr(typecode):
+    item = array(typecode)
+    kind = "f" if typecode in "fd" else "i"
+    return f"{'<' if sys.byteorder == 'little' else '>'}{kind}{item.itemsize}"
+
+
+def _npy_header(descr, length):
+    text = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({length},), }}"
+    body = text.ljust(HEADER_SIZE - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(body)) + body.encode("latin1")
+
+
+class _Column:
+    # дописываемый .npy-файл: заголовок с длиной 0, данные, при закрытии — настоящая длина
+    def __init__(self, path, typecode):
+        self.path = path
+        self.typecode = typecode
+        self.descr = _descr(typecode)
+        self.length = 0
+        self._file = open(path, "wb")
+        self._file.write(_npy_header(self.descr, 0))
+
+    def write(self, data):
+        # data: array того же типа, memoryview на него или список чисел
+        if isinstance(data, list):
+            data = array(self.typecode, data)
+        self.length += len(data)
+        self._file.write(data)
+
+    def read(self, start, stop):
+        # уже записанные элементы [start, stop) -> array (файл читается отдельным дескриптором)
+        self._file.flush()
+        out = array(self.typecode)
+        with open(self.path, "rb") as f:
+            f.seek(HEADER_SIZE + start * out.itemsize)
+            out.frombytes(f.read((stop - start) * out.itemsize))
+        return out
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.descr, self.length))
+        self._file.close()
+
+
+# ------------------------ ЗАПИСЬ ------------------------
+class PartWriter:
+    # одна часть хранилища: реплики одна за другой; flush(sim) по ходу прогона выгружает
+    # новые времена подготовки (список в stats очищается, среднее в end() считается по
+    # колонке на диске) и точки рядов, в памяти от рядов остаются две последние точки
+    # (StepSeries ещё может заменить или убрать последнюю при изменениях в тот же момент)
+    def __init__(self, path, series=SERIES_KEYS):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.series = tuple(series)
+        self.columns = {}
+        self._open("replication", "q")
+        for m in SUMMARY_METRICS:
+            self._open(f"summary.{m}", "q" if m in INTEGER_METRICS else "d")
+        self._open("prep_time", "d")
+        self._open("prep_time.offsets", "q").write([0])
+        for key in self.series:
+            self._open(f"{key}.t", "d")
+            self._open(f"{key}.v", "i")
+            self._open(f"{key}.offsets", "q").write([0])
+        self.replications = 0
+        self._prep_start = 0
+
+    def _open(self, name, typecode):
+        col = self.columns[name] = _Column(os.path.join(self.path, f"{name}.npy"), typecode)
+        return col
+
+    def begin(self, index):
+        self.columns["replication"].write([index])
+        self._prep_start = self.columns["prep_time"].length
+
+    def flush(self, sim, final=False):
+        prep = sim.stats["avg_prep_time"]
+        if prep:
+            self.columns["prep_time"].write(array("d", prep))
+            prep.clear()
+        keep = 0 if final else 2
+        for key in self.series:
+            series = sim.stats[key]
+            n = len(series) - keep
+            if n <= 0:
+                continue
+            times, values = series.buffers()
+            try:
+                self.columns[f"{key}.t"].write(times[:n])
+                self.columns[f"{key}.v"].write(values[:n])
+            finally:
+                times.release()
+                values.release()
+            series.discard_head(n)
+
+    def end(self, sim):
+        # реплика закончена (после finish): остаток рядов, строка сводки, границы реплики
+        self.flush(sim, final=True)
+        # finish() видел только невыгруженный остаток списка: среднее — по всей реплике
+        # из колонки, тем же sum / len, что и в Simulation.finish
+        if sim.prep_stats is None:
+            col = self.columns["prep_time"]
+            prep = col.read(self._prep_start, col.length)
+            sim.stats["avg_prep_time_mean"] = sum(prep) / len(prep) if prep else float("nan")
+        row = summarize(sim.stats)
+        for m in SUMMARY_METRICS:
+            self.columns[f"summary.{m}"].write([row[m]])
+        self.columns["prep_time.offsets"].write([self.columns["prep_time"].length])
+        for key in self.series:
+            self.columns[f"{key}.offsets"].write([self.columns[f"{key}.t"].length])
+        self.replications += 1
+        return row
+
+    def close(self):
+        for col in self.columns.values():
+            col.close()
+        return {
+            "path": os.path.basename(self.path),
+            "replications": self.replications,
+            "columns": {name: {"dtype": c.descr, "length": c.length} for name, c in self.columns.items()},
+        }
+
+
+def write_part(path, params, master_seed, indices, step=None):
+    # реплики indices в одном процессе -> описание части для index.json
+    step = step or float(params["SIM_TIME"]) / DEFAULT_WINDOWS
+    writer = PartWriter(path)
+    try:
+        for i in indices:
+            sim = Simulation(
+                params,
+                rng=replication_rng(master_seed, i),
+                variates=replication_variates(params, master_seed, i),
+                replication=i,
+            )
+            writer.begin(i)
+            for _ in sim.run_iter(step):
+                writer.flush(sim)
+            writer.end(sim)
+    finally:
+        info = writer.close()
+    return info
+
+
+def run_to_columns(root, params, n=None, master_seed=None, workers=None, step=None):
+    # реплики 0 .. n - 1 в хранилище root (части по процессам) -> ColumnStore для чтения
+    n = params["N_REPLICATIONS"] if n is None else n
+    master_seed = resolve_master_seed(params, master_seed)
+    workers = min(resolve_workers(workers), max(1, n))
+    if os.path.exists(os.path.join(root, INDEX)):
+        raise ValueError(f"columnar store already exists: {root}")
+    os.makedirs(root, exist_ok=True)
+
+    bounds = [n * k // workers for k in range(workers + 1)]
+    tasks = [
+        (os.path.join(root, f"part-{k:03d}"), params, master_seed, range(bounds[k], bounds[k + 1]), step)
+        for k in range(workers)
+    ]
+    if workers == 1:
+        parts = [write_part(*tasks[0])]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(write_part, *zip(*tasks)))
+
+    index = {
+        "format": FORMAT,
+        "model": MODEL_VERSION,
+        "params": params,
+        "master_seed": master_seed,
+        "replications": n,
+        "series": list(SERIES_KEYS),
+        "parts": parts,
+    }
+    with open(os.path.join(root, INDEX), "w") as f:
+        json.dump(index, f, indent=2, default=str)
+    return ColumnStore(root)
+
+
+# ------------------------ ЧТЕНИЕ ------------------------
+class ColumnSeries:
+    # ступенчатый ряд одной реплики: представления отображённых колонок (как StepSeries
+    # для resample.as_step_arrays и графиков)
+    __slots__ = ("times", "values")
+
+    def __init__(self, times, values):
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        return f"ColumnSeries(n={len(self.times)})"
+
+
+class ColumnStore:
+    # хранилище только для чтения; колонки открываются при первом обращении
+    def __init__(self, root):
+        with open(os.path.join(root, INDEX)) as f:
+            self.index = json.load(f)
+        if self.index.get("format") != FORMAT:
+            raise ValueError(f"unsupported columnar format: {self.index.get('format')!r}")
+        self.root = root
+        self.params = self.index["params"]
+        self.master_seed = self.index["master_seed"]
+        self.series_keys = tuple(self.index["series"])
+        self.parts = self.index["parts"]
+        self._starts = [0]
+        for part in self.parts:
+            self._starts.append(self._starts[-1] + part["replications"])
+        self._columns = {}
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def column(self, part, name):
+        key = (part, name)
+        col = self._columns.get(key)
+        if col is None:
+            import numpy as np
+
+            path = os.path.join(self.root, self.parts[part]["path"], f"{name}.npy")
+            col = self._columns[key] = np.load(path, mmap_mode="r")
+        return col
+
+    def _whole(self, name):
+        # колонка по всем частям: при одной части — само отображение, иначе склейка
+        cols = [self.column(p, name) for p in range(len(self.parts))]
+        if len(cols) == 1:
+            return cols[0]
+        import numpy as np
+
+        return np.concatenate(cols)
+
+    def _locate(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("replication index out of range")
+        part = bisect.bisect_right(self._starts, i) - 1
+        return part, i - self._starts[part]
+
+    def _ragged(self, part, name, offsets, j):
+        off = self.column(part, offsets)
+        return self.column(part, name)[off[j] : off[j + 1]]
+
+    # ---------- сводки ----------
+    def summary(self, metric):
+        if metric not in SUMMARY_METRICS:
+            raise ValueError(f"unknown metric {metric!r}")
+        return self._whole(f"summary.{metric}")
+
+    def replication_numbers(self):
+        return self._whole("replication")
+
+    def summary_rows(self):
+        # как analysis.summary_rows: список словарей, одна строка на реплику
+        cols = {m: self.summary(m).tolist() for m in SUMMARY_METRICS}
+        return [{m: cols[m][i] for m in SUMMARY_METRICS} for i in range(len(self))]
+
+    def summary_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({m: self.summary(m) for m in SUMMARY_METRICS})
+
+    # ---------- данные одной реплики ----------
+    def prep_times(self, i):
+        part, j = self._locate(i)
+        return self._ragged(part, "prep_time", "prep_time.offsets", j)
+
+    def series(self, key, i):
+        if key not in self.series_keys:
+            raise ValueError(f"unknown series {key!r}")
+        part, j = self._locate(i)
+        return ColumnSeries(
+            self._ragged(part, f"{key}.t", f"{key}.offsets", j),
+            self._ragged(part, f"{key}.v", f"{key}.offsets", j),
+        )
+
+    def replication(self, i):
+        # то, что нужно анализу и графикам из stats реплики: ряды и времена подготовки
+        rep = {key: self.series(key, i) for key in self.series_keys}
+        rep["avg_prep_time"] = self.prep_times(i)
+        return rep
+
+    def __getitem__(self, i):
+        return self.replication(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.replication(i)
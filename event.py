@@ -1,9 +1,26 @@
+from itertools import count
+
+_seq = count()
+
+
 class Event:
+    __slots__ = ("time", "seq", "type", "func", "args")
+
     def __init__(self, time, event_type, func, *args):
         self.time = time
+        # порядковый номер: при равном времени раньше выполняется событие, созданное раньше
+        self.seq = next(_seq)
         self.type = event_type
         self.func = func
         self.args = args
 
+    @classmethod
+    def from_entry(cls, entry):
+        # кортеж (time, seq, event_type, func, args) из списка будущих событий -> Event
+        time, seq, event_type, func, args = entry
+        ev = cls(time, event_type, func, *args)
+        ev.seq = seq
+        return ev
+
     def __lt__(self, other):
-        return self.time < other.time
+        return (self.time, self.seq) < (other.time, other.seq)
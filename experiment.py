@@ -0,0 +1,56 @@
+import copy
+import json
+import os
+
+from replication import run_replications
+
+# ------------------------ ПАРАМЕТРЫ ------------------------
+DEFAULT_PARAMS = {
+    "SIM_TIME": 5000,
+    "N_REPLICATIONS": 5,
+    "MAX_ORDERS": 10,  # количество заказов на один прогон
+    "n_bulldozers": 1,
+    "n_loaders": 2,
+    "n_trucks": 4,
+    "heap_formation_mean": 5,
+    "order_interarrival_mean": 50,
+    "loading_time_mean": 10,
+    "travel_time_mean": 40,
+    "stochastic_loading": True,
+    "stochastic_travel": True,
+    "tracing": False,  # печать трассы включается явно (--trace)
+    "seed": 12345,  # главное зерно: из него выводятся независимые потоки реплик
+    "workers": 1,  # число процессов для прогона реплик (None — все ядра)
+}
+
+
+def load_params(path):
+    # параметры из файла JSON (или TOML, если расширение .toml) поверх значений по умолчанию
+    if os.path.splitext(path)[1].lower() == ".toml":
+        import tomllib
+
+        with open(path, "rb") as f:
+            overrides = tomllib.load(f)
+    else:
+        with open(path) as f:
+            overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path}: expected a mapping of parameters")
+    return {**copy.deepcopy(DEFAULT_PARAMS), **overrides}
+
+
+def parse_assignment(text):
+    # "KEY=VALUE" -> (KEY, значение): VALUE разбирается как JSON, иначе остаётся строкой
+    key, sep, raw = text.partition("=")
+    if not sep or not key:
+        raise ValueError(f"expected KEY=VALUE, got {text!r}")
+    try:
+        return key, json.loads(raw)
+    except json.JSONDecodeError:
+        return key, raw
+
+
+# ------------------------ ЭКСПЕРИМЕНТ ------------------------
+def run_experiments(params):
+    # результаты не зависят от числа процессов: у каждой реплики свой поток случайных чисел
+    return run_replications(params, workers=params.get("workers", 1))
@@ -0,0 +1,147 @@
+import json
+import time
+from array import array
+
+from streamstats import P2Quantile, RunningStats
+
+# ------------------------ НАБЛЮДАТЕЛИ ЦИКЛА СОБЫТИЙ ------------------------
+# Simulation.run вызывает наблюдателей только если список sim.observers не пуст:
+# без них работает обычный цикл, и накладных расходов нет совсем.
+# Каждое событие делится на три фазы: извлечение из списка будущих событий (pop),
+# обработчик события и record_state после него.
+POP_PHASE = "fel.pop"
+RECORD_PHASE = "record_state"
+
+
+class Observer:
+    # базовый наблюдатель: все методы — пустые, переопределяются нужные
+    def on_run_start(self, sim):
+        pass
+
+    def before_event(self, sim, time, event_type):
+        pass
+
+    def after_event(self, sim, event_type, pop_time, handler_time, record_time):
+        # времена фаз — секунды по perf_counter
+        pass
+
+    def on_run_end(self, sim):
+        pass
+
+
+class HandlerProfile:
+    # число вызовов, суммарное время и квантили P² времени одного типа событий
+    __slots__ = ("count", "total", "moments", "quantiles")
+
+    def __init__(self, quantiles):
+        self.count = 0
+        self.total = 0.0
+        self.moments = RunningStats()
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def push(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.moments.push(elapsed)
+        for est in self.quantiles.values():
+            est.push(elapsed)
+
+    def as_dict(self):
+        out = {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_us": self.moments.mean * 1e6,
+            "std_us": self.moments.std * 1e6,
+        }
+        for p, est in self.quantiles.items():
+            out[f"p{round(p * 100):d}_us"] = est.value * 1e6
+        return out
+
+
+class Profiler(Observer):
+    # профиль по типам событий: время обработчиков, pop и record_state отдельно,
+    # размер списка будущих событий каждые fel_every событий, событий в секунду
+    def __init__(self, quantiles=(0.5, 0.95, 0.99), fel_every=1):
+        self.quantiles = quantiles
+        self.fel_every = max(1, int(fel_every))
+        self.handlers = {}
+        self.phases = {POP_PHASE: HandlerProfile(quantiles), RECORD_PHASE: HandlerProfile(quantiles)}
+        self.fel_times = array("d")
+        self.fel_sizes = array("q")
+        self.events = 0
+        self.wall_time = 0.0
+        self._started = None
+
+    def on_run_start(self, sim):
+        self._started = time.perf_counter()
+
+    def after_event(self, sim, event_type, pop_time, handler_time, record_time):
+        prof = self.handlers.get(event_type)
+        if prof is None:
+            prof = self.handlers[event_type] = HandlerProfile(self.quantiles)
+        prof.push(handler_time)
+        self.phases[POP_PHASE].push(pop_time)
+        self.phases[RECORD_PHASE].push(record_time)
+        self.events += 1
+        if self.events % self.fel_every == 0:
+            self.fel_times.append(sim.t)
+            self.fel_sizes.append(len(sim.events))
+
+    def on_run_end(self, sim):
+        # run(until=...) может вызываться несколько раз — время суммируется
+        if self._started is not None:
+            self.wall_time += time.perf_counter() - self._started
+            self._started = None
+
+    @property
+    def events_per_second(self):
+        return self.events / self.wall_time if self.wall_time > 0 else float("nan")
+
+    def as_dict(self):
+        sizes = self.fel_sizes
+        return {
+            "events": self.events,
+            "wall_time_s": self.wall_time,
+            "events_per_second": self.events_per_second,
+            "handlers": {k: v.as_dict() for k, v in sorted(self.handlers.items())},
+            "phases": {k: v.as_dict() for k, v in self.phases.items()},
+            "fel_size": {
+                "max": max(sizes) if sizes else 0,
+                "mean": sum(sizes) / len(sizes) if sizes else float("nan"),
+                "times": list(self.fel_times),
+                "sizes": list(sizes),
+            },
+        }
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def collapsed(self, root="simulation"):
+        # формат «collapsed stacks» (flamegraph.pl, speedscope, inferno): "кадр;кадр вес",
+        # вес — микросекунды
+        lines = []
+        for name, prof in sorted(self.handlers.items()):
+            lines.append(f"{root};run;{name} {round(prof.total * 1e6)}")
+        for name, prof in self.phases.items():
+            lines.append(f"{root};run;{name} {round(prof.total * 1e6)}")
+        return "\n".join(lines) + "\n"
+
+    def to_collapsed(self, path, root="simulation"):
+        with open(path, "w") as f:
+            f.write(self.collapsed(root))
+
+    def report(self, limit=None):
+        # текстовая таблица по убыванию суммарного времени
+        rows = sorted(
+            list(self.handlers.items()) + list(self.phases.items()), key=lambda kv: kv[1].total, reverse=True
+        )
+        lines = [f"{'event type':<20}{'count':>10}{'total, s':>12}{'mean, us':>12}{'p95, us':>12}"]
+        for name, prof in rows[:limit]:
+            p95 = prof.quantiles.get(0.95)
+            p95 = p95.value * 1e6 if p95 is not None else float("nan")
+            lines.append(
+                f"{name:<20}{prof.count:>10}{prof.total:>12.4f}{prof.moments.mean * 1e6:>12.2f}{p95:>12.2f}"
+            )
+        lines.append(f"events: {self.events}, events/s: {self.events_per_second:.0f}")
+        return "\n".join(lines)
@@ -0,0 +1,63 @@
+import asyncio
+
+# ------------------------ ПОТОКОВЫЙ ВЫВОД ДЛЯ ASYNCIO ------------------------
+# Обёртки над Simulation.run_iter: много прогонов в одном потоке, каждый отдаёт управление
+# циклу событий после каждого окна. Обратное давление — через ограниченную очередь:
+# если потребитель не успевает, прогоны ждут на put и не считают дальше.
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def stream(sim, step, until=None, stop_orders=None, windows_per_yield=1):
+    # асинхронный генератор сводок одного прогона
+    n = 0
+    for record in sim.run_iter(step, until=until, stop_orders=stop_orders):
+        yield record
+        n += 1
+        if n % windows_per_yield == 0:
+            await asyncio.sleep(0)
+
+
+async def _pump(index, source, queue):
+    try:
+        async for record in source:
+            await queue.put((index, record))
+    except Exception as error:
+        # ошибка прогона передаётся потребителю и поднимается в merge
+        await queue.put((index, _Failure(error)))
+        return
+    await queue.put((index, _DONE))
+
+
+async def merge(sources, maxsize=64):
+    # сводки нескольких прогонов в одном потоке: пары (номер источника, сводка)
+    # в порядке готовности; maxsize ограничивает число непрочитанных сводок
+    queue = asyncio.Queue(maxsize=maxsize)
+    tasks = [asyncio.ensure_future(_pump(i, src, queue)) for i, src in enumerate(sources)]
+    active = len(tasks)
+    try:
+        while active:
+            index, record = await queue.get()
+            if record is _DONE:
+                active -= 1
+                continue
+            if isinstance(record, _Failure):
+                raise record.error
+            yield index, record
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def stream_many(sims, step, maxsize=64, **kwargs):
+    # удобная форма merge для списка Simulation с одинаковым шагом
+    async for item in merge([stream(sim, step, **kwargs) for sim in sims], maxsize=maxsize):
+        yield item
@@ -1,40 +1,105 @@
-#
-#
-#
-# import simulator
-#
-#
-# if __name__ == "__main__":
-#
-#     params = {
-#         "initial_piles": 1,
-#         "num_loaders": 2,
-#         "num_trucks": 4,
-#
-#         # интервалы (в секундах или условных единицах)
-#         "bulldozer_time_range": (0.5, 2),
-#         "loading_time_range": (1, 3),
-#         "travel_to_dump_range": (2, 3),
-#         "unloading_time_range": (1, 3),
-#         "return_time_range": (2, 3),
-#
-#         "report_interval": 5.0
-#     }
-#
-#
-#     sim = simulator.Simulator(params, seed=12345, trace=True)
-#     res = sim.run(until=500.0, max_loaded=50)
-#
-#     print("\nSIMULATION SUMMARY")
-#     print(f"Simulated time: {res['sim_time']:.3f}")
-#     print(f"Total loaded truck cycles completed: {res['total_loaded_trucks']}")
-#     if res['avg_cycle_time'] is not None:
-#         print(f"Average truck cycle time: {res['avg_cycle_time']:.3f}")
-#     print(f"Loader utilization per machine (fraction of time busy): {res['loader_utilization_per_machine']}")
-#     # print(f"Bulldozer work time fraction (approx): {res['bulldozer_utilization']}")
-#     print(f"Final piles on site: {res['final_piles']}")
-#     print(f"Last truck states: {res['trucks_states']}")
-#     # print few samples
-#     print("\nsamples:")
-#     for s in res['samples'][:10]:
-#         print(f" time={s['time']:.1f} piles={s['piles']} loaders_busy={s['loaders_busy']} loaded={s['total_loaded_trucks']}")
+import argparse
+import json
+import math
+import sys
+
+from experiment import DEFAULT_PARAMS, load_params, parse_assignment
+
+# ------------------------ КОМАНДНАЯ СТРОКА ------------------------
+# python main.py [--params file.json] [--set KEY=VALUE ...] [--plot-dir plots]
+# Модули анализа и графиков (numpy, pandas, matplotlib) подгружаются только когда нужны.
+
+
+def build_params(args):
+    params = load_params(args.params) if args.params else dict(DEFAULT_PARAMS)
+    flags = {
+        "N_REPLICATIONS": args.replications,
+        "SIM_TIME": args.sim_time,
+        "MAX_ORDERS": args.max_orders,
+        "seed": args.seed,
+        "workers": args.workers,
+    }
+    params.update({k: v for k, v in flags.items() if v is not None})
+    for assignment in args.set:
+        key, value = parse_assignment(assignment)
+        params[key] = value
+    if args.trace:
+        params["tracing"] = True
+    return params
+
+
+def _finite(value):
+    # NaN и бесконечности (нет завершённых заказов) -> null: JSON без нестандартных NaN
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="earthwork site simulation: replications, metrics, plots")
+    ap.add_argument("--params", help="JSON or TOML file with parameters (over the defaults)")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override one parameter")
+    ap.add_argument("-n", "--replications", type=int)
+    ap.add_argument("--sim-time", type=float)
+    ap.add_argument("--max-orders", type=int)
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--trace", action="store_true", help="print the event trace")
+    ap.add_argument("--plot-dir", help="save time-series plots of the first replication here")
+    ap.add_argument("--plot-format", default="png")
+    ap.add_argument("--window", type=float, default=50, help="rolling-mean window for plots")
+    ap.add_argument("--output", help="write metrics and per-replication summaries as JSON")
+    ap.add_argument("--columns", metavar="DIR", help="stream replications into a columnar store in DIR")
+    ap.add_argument("--show-params", action="store_true", help="print the resolved parameters and exit")
+    args = ap.parse_args(argv)
+
+    try:
+        params = build_params(args)
+    except (OSError, ValueError) as exc:
+        ap.error(str(exc))
+    if args.show_params:
+        print(json.dumps(params, indent=2, sort_keys=True))
+        return 0
+
+    from analysis import aggregate_metrics, format_metrics, summary_rows
+
+    if args.columns:
+        # результаты пишутся на диск по ходу прогона, дальше читаются из хранилища
+        from columnar import run_to_columns
+
+        try:
+            runs = run_to_columns(args.columns, params, workers=params.get("workers", 1))
+        except ValueError as exc:
+            ap.error(str(exc))
+        rows = runs.summary_rows()
+    else:
+        from experiment import run_experiments
+
+        runs = run_experiments(params)
+        rows = summary_rows(runs)
+    metrics = aggregate_metrics(rows)
+
+    if args.plot_dir:
+        from plotting import plot_time_series
+
+        for path in plot_time_series(runs[0], args.plot_dir, args.window, fmt=args.plot_format):
+            print(f"saved {path}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                _finite({"params": params, "metrics": metrics, "replications": rows}),
+                f,
+                indent=2,
+                allow_nan=False,
+            )
+
+    print(format_metrics(metrics))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
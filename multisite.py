@@ -0,0 +1,370 @@
+import math
+import multiprocessing
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+from fel import make_event_list
+from orderbook import OrderBook
+from replication import replication_seed, resolve_master_seed, resolve_workers
+from simulator import UNLOAD_TIME
+
+# ------------------------ СЕТЬ ПЛОЩАДОК ------------------------
+# Несколько карьеров (площадок) со своими бульдозерами, погрузчиками и заказами.
+# Самосвалы общие: после разгрузки у заказчика самосвал едет на следующую площадку
+# (выбор — по строке routing) и прибывает туда не раньше чем через transfer_time[i][j].
+# Переезд между площадками — единственная связь: сообщение (время прибытия, откуда,
+# номер, куда).
+#
+# Синхронизация консервативная, окнами: lookahead L = минимальное время переезда.
+# Сообщение, отправленное в момент t >= T, приходит не раньше t + L >= T + L, поэтому
+# события окна [T, T + L) каждая площадка обрабатывает независимо, а сообщения окна
+# доставляются перед следующим. Входящие сообщения упорядочиваются по (время, откуда,
+# номер), поэтому результат не зависит ни от числа процессов, ни от распределения
+# площадок по ним: последовательный прогон (workers=1) даёт ровно те же числа.
+
+
+def site_rng(master_seed, replication, site):
+    # у каждой площадки свой поток, выведенный из зерна реплики
+    return random.Random(replication_seed(f"{master_seed}:{replication}", f"site{site}"))
+
+
+def _matrix(value, n):
+    if isinstance(value, (int, float)):
+        return [[float(value)] * n for _ in range(n)]
+    return [[float(x) for x in row] for row in value]
+
+
+def lookahead(params):
+    n = len(params["sites"])
+    transfer = _matrix(params.get("transfer_time", 30), n)
+    la = min(min(row) for row in transfer)
+    if la <= 0:
+        raise ValueError("conservative synchronization needs a positive minimum transfer_time")
+    return la
+
+
+class Site:
+    def __init__(self, index, params, rng):
+        n = len(params["sites"])
+        self.index = index
+        self.params = {**params, **params["sites"][index]}
+        p = self.params
+        self.rng = rng
+        self.t = 0.0
+        self.events = make_event_list(p.get("event_list", "heap"))
+        self.transfer = _matrix(p.get("transfer_time", 30), n)[index]
+        routing = p.get("routing")
+        weights = [1.0] * n if routing is None else [float(w) for w in routing[index]]
+        self.cum_routing = list(accumulate(weights))
+        self.jitter_mean = p.get("transfer_jitter_mean", 0)
+
+        self.resources = {"bulldozer": int(p.get("n_bulldozers", 1)), "loaders": int(p.get("n_loaders", 2))}
+        self.busy = {"bulldozer": 0, "loaders": 0}
+        self.area_busy = {r: 0.0 for r in self.resources}
+        # самосвалы на площадке: свободные (idle_trucks) и под погрузкой (= busy["loaders"])
+        self.idle_trucks = int(p.get("initial_trucks", p.get("n_trucks", 4)))
+        self.area_idle_trucks = 0.0
+        self.heaps = 0
+        self.n_orders = 0
+        self.order_book = OrderBook(p.get("dispatch_policy", "fifo"))
+        self.outbox = []
+        self.n_sent = 0
+        self.stats = {
+            "delivered_heaps": 0,
+            "orders_completed": 0,
+            "trips": 0,
+            "avg_prep_time": [],
+            "trucks_in": 0,
+            "trucks_out": 0,
+        }
+
+    def schedule(self, delay, event_type, func, *args):
+        self.events.push(self.t + delay, event_type, func, args)
+
+    def sample(self, mean):
+        return self.rng.expovariate(1.0 / mean)
+
+    def next_time(self):
+        return self.events.peek_time()
+
+    # -------------------- ОБМЕН С ДРУГИМИ ПЛОЩАДКАМИ --------------------
+    def receive(self, messages):
+        for time, src, seq, dst in messages:
+            if time < self.t:
+                raise RuntimeError(f"site {self.index}: message from site {src} at {time} is in the past ({self.t})")
+            self.events.push(time, "truck_in", self.truck_in)
+
+    def take_outbox(self):
+        out, self.outbox = self.outbox, []
+        return out
+
+    def run_until(self, end):
+        # события строго раньше end (конец окна)
+        events = self.events
+        while events and events.peek_time() < end:
+            time, _, _, func, args = events.pop()
+            dt = time - self.t
+            if dt > 0:
+                self._integrate(dt)
+            self.t = time
+            func(*args)
+
+    def _integrate(self, dt):
+        for r in self.busy:
+            self.area_busy[r] += self.busy[r] * dt
+        self.area_idle_trucks += self.idle_trucks * dt
+
+    # -------------------- ПРОЦЕССЫ --------------------
+    def initialize(self):
+        self.schedule(0, "order_arrival", self.order_arrival)
+        for _ in range(self.resources["bulldozer"]):
+            self.schedule(0, "heap_formation", self.form_heap)
+
+    def order_arrival(self):
+        if self.n_orders >= self.params["MAX_ORDERS"]:
+            return
+        order_id = self.n_orders
+        self.n_orders += 1
+        self.order_book.add(order_id, {"required": self.rng.randint(3, 7), "done": 0, "start": self.t})
+        self.try_loading()
+        if self.n_orders < self.params["MAX_ORDERS"]:
+            self.schedule(self.sample(self.params["order_interarrival_mean"]), "order_arrival", self.order_arrival)
+
+    def form_heap(self):
+        if self.busy["bulldozer"] < self.resources["bulldozer"]:
+            self.busy["bulldozer"] += 1
+            self.schedule(self.sample(self.params["heap_formation_mean"]), "heap_ready", self.heap_ready)
+
+    def heap_ready(self):
+        self.busy["bulldozer"] -= 1
+        self.heaps += 1
+        self.try_loading()
+        self.schedule(0, "heap_formation", self.form_heap)
+
+    def try_loading(self):
+        while (
+            self.busy["loaders"] < self.resources["loaders"]
+            and self.idle_trucks > 0
+            and self.heaps >= 2
+            and self.order_book.has_pending()
+        ):
+            self.start_loading()
+
+    def start_loading(self):
+        order_id = self.order_book.next_pending()
+        self.busy["loaders"] += 1
+        self.idle_trucks -= 1
+        self.heaps -= 2
+        p = self.params
+        delay = self.sample(p["loading_time_mean"]) if p["stochastic_loading"] else p["loading_time_mean"]
+        self.schedule(delay, "loading_done", self.loading_done, order_id)
+
+    def loading_done(self, order_id):
+        # самосвал уходит с площадки: доставка заказчику, разгрузка, переезд на площадку dst
+        self.busy["loaders"] -= 1
+        p = self.params
+        travel = self.sample(p["travel_time_mean"]) if p["stochastic_travel"] else p["travel_time_mean"]
+        # доставленные кучи считаются как в Simulation: +2 по прибытии к заказчику,
+        # +2 по окончании разгрузки (рейс засчитывается тогда же)
+        self.events.push(self.t + travel, "arrived", self.arrived, ())
+        delivered = self.t + travel + UNLOAD_TIME
+        self.events.push(delivered, "delivered", self.delivered, (order_id,))
+
+        dst = bisect_right(self.cum_routing, self.rng.random() * self.cum_routing[-1])
+        arrival = delivered + self.transfer[dst]
+        if self.jitter_mean > 0:
+            arrival += self.sample(self.jitter_mean)
+        self.outbox.append((arrival, self.index, self.n_sent, dst))
+        self.n_sent += 1
+        self.stats["trucks_out"] += 1
+        self.try_loading()
+
+    def arrived(self):
+        self.stats["delivered_heaps"] += 2
+
+    def delivered(self, order_id):
+        self.stats["delivered_heaps"] += 2
+        self.stats["trips"] += 1
+        if order_id not in self.order_book:
+            return
+        order = self.order_book.progress(order_id, 2)
+        if order["done"] >= order["required"]:
+            self.stats["orders_completed"] += 1
+            self.stats["avg_prep_time"].append(self.t - order["start"])
+            del self.order_book[order_id]
+
+    def truck_in(self):
+        self.idle_trucks += 1
+        self.stats["trucks_in"] += 1
+        self.try_loading()
+
+    def finish(self, sim_time):
+        if self.t < sim_time:
+            self._integrate(sim_time - self.t)
+            self.t = sim_time
+        prep = self.stats["avg_prep_time"]
+        self.stats["avg_prep_time_mean"] = sum(prep) / len(prep) if prep else math.nan
+        self.stats["utilization"] = {
+            r: self.area_busy[r] / (self.resources[r] * sim_time) if self.resources[r] else math.nan
+            for r in self.resources
+        }
+        self.stats["mean_idle_trucks"] = self.area_idle_trucks / sim_time
+        self.stats["idle_trucks"] = self.idle_trucks
+        self.stats["loading_trucks"] = self.busy["loaders"]
+        # доставленные сообщения, чьё прибытие позже конца моделирования
+        self.stats["arriving_trucks"] = sum(1 for entry in self.events.entries() if entry[2] == "truck_in")
+        return self.stats
+
+
+# ------------------------ ИСПОЛНИТЕЛИ ОКОН ------------------------
+class LocalSites:
+    # все площадки в текущем процессе (последовательный прогон)
+    def __init__(self, params, master_seed, replication, indices):
+        self.sites = {i: Site(i, params, site_rng(master_seed, replication, i)) for i in indices}
+
+    def start(self):
+        for site in self.sites.values():
+            site.initialize()
+        return {i: site.next_time() for i, site in self.sites.items()}
+
+    def advance(self, inboxes, end):
+        outboxes, next_times = {}, {}
+        for i, site in self.sites.items():
+            site.receive(inboxes.get(i, ()))
+            site.run_until(end)
+            outboxes[i] = site.take_outbox()
+            next_times[i] = site.next_time()
+        return outboxes, next_times
+
+    def finish(self, sim_time):
+        return {i: site.finish(sim_time) for i, site in self.sites.items()}
+
+    def close(self):
+        pass
+
+
+def _site_worker(conn, params, master_seed, replication, indices):
+    # процесс-исполнитель: владеет своими площадками и выполняет команды координатора
+    local = LocalSites(params, master_seed, replication, indices)
+    while True:
+        cmd, *args = conn.recv()
+        if cmd == "start":
+            conn.send(local.start())
+        elif cmd == "advance":
+            conn.send(local.advance(*args))
+        elif cmd == "finish":
+            conn.send(local.finish(*args))
+            break
+    conn.close()
+
+
+class ProcessSites:
+    # площадки распределены по процессам по кругу; окно выполняется всеми процессами сразу
+    def __init__(self, params, master_seed, replication, n_sites, workers):
+        self.groups = [list(range(w, n_sites, workers)) for w in range(workers)]
+        self.conns = []
+        self.procs = []
+        for group in self.groups:
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_site_worker, args=(child, params, master_seed, replication, group), daemon=True
+            )
+            proc.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(proc)
+
+    def _gather(self):
+        result = {}
+        for conn in self.conns:
+            result.update(conn.recv())
+        return result
+
+    def start(self):
+        for conn in self.conns:
+            conn.send(("start",))
+        return self._gather()
+
+    def advance(self, inboxes, end):
+        for conn, group in zip(self.conns, self.groups):
+            conn.send(("advance", {i: inboxes[i] for i in group if i in inboxes}, end))
+        outboxes, next_times = {}, {}
+        for conn in self.conns:
+            out, nxt = conn.recv()
+            outboxes.update(out)
+            next_times.update(nxt)
+        return outboxes, next_times
+
+    def finish(self, sim_time):
+        for conn in self.conns:
+            conn.send(("finish", sim_time))
+        return self._gather()
+
+    def close(self):
+        for proc in self.procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+
+
+# ------------------------ КООРДИНАТОР ------------------------
+def run_multisite(params, master_seed=None, replication=0, workers=1, window=None):
+    # window — ширина окна синхронизации (не больше lookahead; по умолчанию равна ему).
+    # Более узкие окна дают тот же результат, только с большим числом обменов
+    n_sites = len(params["sites"])
+    sim_time = float(params["SIM_TIME"])
+    la = lookahead(params)
+    if window is not None:
+        if not 0 < window <= la:
+            raise ValueError(f"window must be in (0, {la}], got {window!r}")
+        la = window
+    master_seed = resolve_master_seed(params, master_seed)
+    workers = min(resolve_workers(workers), n_sites)
+    if workers == 1:
+        backend = LocalSites(params, master_seed, replication, range(n_sites))
+    else:
+        backend = ProcessSites(params, master_seed, replication, n_sites, workers)
+
+    try:
+        next_times = backend.start()
+        inboxes = {}
+        windows = 0
+        messages = 0
+        while True:
+            pending = min(
+                [t for t in next_times.values()] + [box[0][0] for box in inboxes.values() if box],
+                default=math.inf,
+            )
+            if pending >= sim_time:
+                break
+            end = min(pending + la, sim_time)
+            outboxes, next_times = backend.advance(inboxes, end)
+            inboxes = {}
+            for i in sorted(outboxes):
+                for msg in outboxes[i]:
+                    inboxes.setdefault(msg[3], []).append(msg)
+                    messages += 1
+            for box in inboxes.values():
+                box.sort()
+            windows += 1
+        site_stats = backend.finish(sim_time)
+    finally:
+        backend.close()
+
+    sites = [site_stats[i] for i in range(n_sites)]
+    totals = {
+        key: sum(s[key] for s in sites) for key in ("delivered_heaps", "orders_completed", "trips")
+    }
+    prep = [x for s in sites for x in s["avg_prep_time"]]
+    totals["avg_prep_time_mean"] = sum(prep) / len(prep) if prep else math.nan
+    return {
+        "sites": sites,
+        "totals": totals,
+        "lookahead": lookahead(params),
+        "window": la,
+        "windows": windows,
+        "messages": messages,
+        # самосвалы в пути к моменту SIM_TIME
+        "in_transit": sum(len(box) for box in inboxes.values()) + sum(s["arriving_trucks"] for s in sites),
+    }
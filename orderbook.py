@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from heapq import heappop, heappush
+
+
+# ------------------------ ПОЛИТИКИ ДИСПЕТЧЕРИЗАЦИИ ------------------------
+# Политика хранит только незавершённые заказы (done < required) и отвечает на вопрос
+# «какому заказу отдать следующий самосвал» без обхода всех заказов.
+
+
+class FifoPolicy:
+    # в порядке поступления: OrderedDict даёт O(1) для первого элемента и удаления
+    name = "fifo"
+
+    def __init__(self):
+        self._pending = OrderedDict()
+
+    def add(self, order_id, order):
+        self._pending[order_id] = None
+
+    def update(self, order_id, order):
+        pass
+
+    def remove(self, order_id):
+        self._pending.pop(order_id, None)
+
+    def first(self):
+        return next(iter(self._pending)) if self._pending else None
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class PriorityPolicy:
+    # куча (ключ, номер заказа, версия) с ленивым удалением устаревших записей;
+    # при равном ключе раньше обслуживается заказ, поступивший раньше
+    name = "priority"
+
+    def __init__(self):
+        self._heap = []
+        self._version = {}
+
+    def key(self, order):
+        raise NotImplementedError
+
+    def add(self, order_id, order):
+        self._version[order_id] = 0
+        heappush(self._heap, (self.key(order), order_id, 0))
+
+    def update(self, order_id, order):
+        version = self._version.get(order_id)
+        if version is None:
+            return
+        self._version[order_id] = version + 1
+        heappush(self._heap, (self.key(order), order_id, version + 1))
+
+    def remove(self, order_id):
+        self._version.pop(order_id, None)
+
+    def first(self):
+        heap, version = self._heap, self._version
+        while heap:
+            _, order_id, v = heap[0]
+            if version.get(order_id) == v:
+                return order_id
+            heappop(heap)
+        return None
+
+    def __len__(self):
+        return len(self._version)
+
+
+class ShortestRemainingPolicy(PriorityPolicy):
+    # меньше всего осталось довезти
+    name = "shortest_remaining"
+
+    def key(self, order):
+        return order["required"] - order["done"]
+
+
+class EarliestDeadlinePolicy(PriorityPolicy):
+    # ближайший срок (deadline), без срока — по времени поступления
+    name = "earliest_deadline"
+
+    def key(self, order):
+        return order.get("deadline", order["start"])
+
+    def update(self, order_id, order):
+        # срок не меняется по ходу выполнения — перестановка не нужна
+        pass
+
+
+DISPATCH_POLICIES = {cls.name: cls for cls in (FifoPolicy, ShortestRemainingPolicy, EarliestDeadlinePolicy)}
+
+
+def make_policy(policy="fifo"):
+    # policy: имя из DISPATCH_POLICIES, класс или фабрика без аргументов. Политика хранит
+    # состояние (незавершённые заказы), поэтому каждая книга получает новый экземпляр;
+    # готовый объект не принимается — он оказался бы общим для всех прогонов
+    if isinstance(policy, str):
+        try:
+            return DISPATCH_POLICIES[policy]()
+        except KeyError:
+            raise ValueError(f"unknown dispatch policy: {policy!r}") from None
+    if not callable(policy):
+        raise ValueError(f"dispatch policy must be a name, class or factory, got {policy!r}")
+    return policy()
+
+
+# ------------------------ КНИГА ЗАКАЗОВ ------------------------
+class OrderBook:
+    # активные заказы {order_id: {"required", "done", "start", ...}} с индексом незавершённых;
+    # снаружи ведёт себя как dict (in, [], del, values, items)
+    def __init__(self, policy="fifo", orders=None):
+        self._orders = {}
+        self.factory = policy  # то, из чего строится политика: для новых книг и снимков
+        self.policy = make_policy(policy)
+        for order_id, order in (orders or {}).items():
+            self.add(order_id, order)
+
+    def add(self, order_id, order):
+        self._orders[order_id] = order
+        if order["done"] < order["required"]:
+            self.policy.add(order_id, order)
+
+    def progress(self, order_id, amount):
+        order = self._orders[order_id]
+        order["done"] += amount
+        if order["done"] >= order["required"]:
+            self.policy.remove(order_id)
+        else:
+            self.policy.update(order_id, order)
+        return order
+
+    def next_pending(self):
+        # заказ, которому нужен следующий самосвал (None, если таких нет) — O(1)
+        return self.policy.first()
+
+    def has_pending(self):
+        return len(self.policy) > 0
+
+    def __delitem__(self, order_id):
+        del self._orders[order_id]
+        self.policy.remove(order_id)
+
+    def __getitem__(self, order_id):
+        return self._orders[order_id]
+
+    def __contains__(self, order_id):
+        return order_id in self._orders
+
+    def __iter__(self):
+        return iter(self._orders)
+
+    def __len__(self):
+        return len(self._orders)
+
+    def keys(self):
+        return self._orders.keys()
+
+    def values(self):
+        return self._orders.values()
+
+    def items(self):
+        return self._orders.items()
+
+    def __repr__(self):
+        name = getattr(self.policy, "name", type(self.policy).__name__)
+        return f"OrderBook({name}, {self._orders!r})"
@@ -0,0 +1,46 @@
+import os
+
+# ------------------------ ГРАФИКИ ------------------------
+# рисуется без pyplot: Figure + холст Agg пишут прямо в файл, окон не открывается и
+# глобальный backend matplotlib не меняется
+
+SERIES = [
+    ("Trucks busy", "busy_trucks"),
+    ("Loaders busy", "busy_loaders"),
+    ("Bulldozer busy", "bulldozer_busy"),
+]
+
+
+def plot_time_series(rep, out_dir, window_seconds=50, points=1000, fmt="png"):
+    # ряды занятости одной реплики: мгновенное значение и скользящее среднее по времени;
+    # возвращает пути сохранённых файлов
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from analysis import run_end_time
+    from resample import as_step_arrays, sliding_time_average, step_values_at
+
+    os.makedirs(out_dir, exist_ok=True)
+    time_grid = np.linspace(0, run_end_time(rep), points)
+    paths = []
+    for name, evt_key in SERIES:
+        times, values = as_step_arrays(rep[evt_key])
+        s_grid = step_values_at(times, values, time_grid)
+        rolling = sliding_time_average(times, values, time_grid, window_seconds)
+
+        fig = Figure(figsize=(10, 4))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.step(time_grid, s_grid, where="post", label="Instant (step)", linewidth=1)
+        ax.plot(time_grid, rolling, linewidth=2, label=f"Rolling mean ({window_seconds}s)")
+        ax.set_xlabel("Time")
+        ax.set_ylabel(name)
+        ax.set_title(f"Time series: {name}")
+        ax.grid(True, linestyle=":", linewidth=0.6)
+        ax.legend()
+        fig.tight_layout()
+        path = os.path.join(out_dir, f"{evt_key}.{fmt}")
+        fig.savefig(path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,146 @@
+from array import array
+
+
+# ------------------------ СТУПЕНЧАТЫЙ РЯД ------------------------
+class StepSeries:
+    # ряд (время, значение), в который попадают только изменения значения.
+    # данные лежат в типизированных буферах array с запасом ёмкости (удвоение при росте)
+    __slots__ = ("_t", "_v", "_n")
+
+    def __init__(self, capacity=1024, typecode="i"):
+        capacity = max(1, capacity)
+        self._t = array("d", bytes(8 * capacity))
+        self._v = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self._n = 0
+
+    @classmethod
+    def from_arrays(cls, times, values, typecode="i"):
+        s = cls(len(times), typecode)
+        for t, v in zip(times, values):
+            s.append(t, v)
+        return s
+
+    def append(self, t, v):
+        n = self._n
+        if n:
+            last = n - 1
+            vals = self._v
+            if vals[last] == v:
+                return
+            if self._t[last] == t:
+                # несколько изменений в один момент — остаётся последнее (как keep='last')
+                if last and vals[last - 1] == v:
+                    self._n = last
+                else:
+                    vals[last] = v
+                return
+        if n == len(self._t):
+            self._grow()
+        self._t[n] = t
+        self._v[n] = v
+        self._n = n + 1
+
+    def _grow(self):
+        # удвоение на месте; если буфер отдан numpy-представлениям (times/values), расширить
+        # его нельзя (BufferError) — тогда точки переезжают в новый буфер, а старые
+        # представления остаются рабочими и показывают ряд на момент их получения
+        self._t = _extended(self._t)
+        self._v = _extended(self._v)
+
+    def clear(self):
+        self._n = 0
+
+    # ---------- выгрузка на диск по ходу прогона (columnar) ----------
+    def buffers(self):
+        # (времена, значения) — memoryview заполненной части без копирования;
+        # их стоит освободить (release) до следующего append, иначе рост буфера — копией
+        return memoryview(self._t)[: self._n], memoryview(self._v)[: self._n]
+
+    def discard_head(self, k):
+        # убрать первые k точек (уже записанных), хвост сдвигается в начало буфера
+        # (новые буферы той же ёмкости: уже выданные представления не меняются)
+        k = min(k, self._n)
+        self._t = _shifted(self._t, k)
+        self._v = _shifted(self._v, k)
+        self._n -= k
+
+    # ---------- доступ как к списку (t, value) ----------
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("StepSeries index out of range")
+        return self._t[i], self._v[i]
+
+    def __iter__(self):
+        t, v = self._t, self._v
+        for i in range(self._n):
+            yield t[i], v[i]
+
+    def __eq__(self, other):
+        if isinstance(other, (StepSeries, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"StepSeries(n={self._n})"
+
+    def __reduce__(self):
+        return _rebuild_series, (self._t[: self._n], self._v[: self._n])
+
+    # ---------- представления numpy без копирования ----------
+    @property
+    def times(self):
+        import numpy as np
+
+        return np.frombuffer(self._t, dtype=np.float64)[: self._n]
+
+    @property
+    def values(self):
+        import numpy as np
+
+        return np.frombuffer(self._v, dtype=np.dtype(self._v.typecode))[: self._n]
+
+
+def _extended(buf):
+    pad = bytes(len(buf) * buf.itemsize)
+    try:
+        buf.frombytes(pad)
+    except BufferError:
+        buf = array(buf.typecode, buf)
+        buf.frombytes(pad)
+    return buf
+
+
+def _shifted(buf, k):
+    out = buf[k:]
+    out.frombytes(bytes(k * buf.itemsize))
+    return out
+
+
+def _rebuild_series(t, v):
+    s = StepSeries.__new__(StepSeries)
+    s._t, s._v, s._n = t, v, len(t)
+    return s
+
+
+# ------------------------ РЕГИСТРАТОР СОСТОЯНИЯ ------------------------
+class StateRecorder:
+    # channels: {ключ в stats: имя ресурса в busy}
+    def __init__(self, channels, history=True, capacity=1024):
+        self.history = history
+        self.series = {key: StepSeries(capacity) for key in channels} if history else {}
+        # пары (ряд, ресурс) для быстрого обхода в record
+        self._channels = tuple((self.series[key], res) for key, res in channels.items()) if history else ()
+
+    def record(self, t, busy):
+        for series, res in self._channels:
+            series.append(t, busy[res])
+
+    def as_arrays(self):
+        return {key: (s.times, s.values) for key, s in self.series.items()}
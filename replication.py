@@ -0,0 +1,186 @@
+import hashlib
+import os
+import random
+from itertools import repeat
+
+from simulator import Simulation
+from streamstats import RunningStats
+
+
+# ------------------------ ЗЕРНА РЕПЛИК ------------------------
+def replication_seed(master_seed, index):
+    # зерно реплики зависит только от (master_seed, index), поэтому результат
+    # не зависит ни от числа процессов, ни от порядка их завершения
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def replication_rng(master_seed, index):
+    return random.Random(replication_seed(master_seed, index))
+
+
+# ------------------------ ЗАПУСК РЕПЛИК ------------------------
+def replication_variates(params, master_seed, index):
+    # common_random_numbers: отдельные потоки по активностям, одинаковые для реплики index
+    # во всех сценариях с тем же главным зерном
+    if not params.get("common_random_numbers"):
+        return None
+    from variates import VariateStreams
+
+    return VariateStreams(master_seed, index, block=params.get("variate_block", 4096))
+
+
+def run_replication(params, master_seed, index):
+    sim = Simulation(
+        params,
+        rng=replication_rng(master_seed, index),
+        variates=replication_variates(params, master_seed, index),
+        replication=index,
+    )
+    sim.start()
+    return sim.stats
+
+
+def resolve_master_seed(params, master_seed=None):
+    if master_seed is None:
+        master_seed = params.get("seed")
+    if master_seed is None:
+        # без явного зерна берём случайное, но реплики всё равно независимы между собой
+        master_seed = random.SystemRandom().getrandbits(64)
+    return master_seed
+
+
+def resolve_workers(workers):
+    if workers is None:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def run_replications(params, n=None, master_seed=None, workers=None, start=0):
+    # реплики с индексами start .. start + n - 1; результаты в порядке индексов
+    n = params["N_REPLICATIONS"] if n is None else n
+    master_seed = resolve_master_seed(params, master_seed)
+    workers = min(resolve_workers(workers), max(1, n))
+    indices = range(start, start + n)
+
+    if workers == 1:
+        return [run_replication(params, master_seed, i) for i in indices]
+
+    chunksize = max(1, n // (workers * 4))
+    from concurrent.futures import ProcessPoolExecutor  # тянет multiprocessing: только для пула
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(run_replication, repeat(params), repeat(master_seed), indices, chunksize=chunksize)
+        )
+
+
+# ------------------------ СВОДКА РЕПЛИКИ ------------------------
+SUMMARY_METRICS = (
+    "delivered_heaps",
+    "trips",
+    "orders_completed",
+    "avg_prep_time",
+    "bulldozer_util",
+    "loaders_util",
+    "trucks_util",
+)
+
+
+def summarize(stats):
+    # плоская сводка одной реплики (строка df_summary в newone)
+    return {
+        "delivered_heaps": stats["delivered_heaps"],
+        "trips": stats["trips"],
+        "orders_completed": stats["orders_completed"],
+        "avg_prep_time": stats["avg_prep_time_mean"],
+        "bulldozer_util": stats["utilization"]["bulldozer"],
+        "loaders_util": stats["utilization"]["loaders"],
+        "trucks_util": stats["utilization"]["trucks"],
+    }
+
+
+# ------------------------ ПОСЛЕДОВАТЕЛЬНЫЙ РЕЖИМ ------------------------
+def _target(value, metric):
+    if isinstance(value, dict):
+        return value.get(metric)
+    return value
+
+
+def run_until_precision(
+    params,
+    metrics=SUMMARY_METRICS,
+    rel_width=None,
+    abs_width=None,
+    batch=None,
+    min_replications=10,
+    max_replications=1000,
+    master_seed=None,
+    workers=None,
+):
+    # реплики запускаются пачками, пока полуширина 95% ДИ каждой метрики не станет
+    # <= abs_width или <= rel_width * |среднее| (число или {метрика: значение}),
+    # либо пока не исчерпан бюджет max_replications
+    if rel_width is None and abs_width is None:
+        raise ValueError("set rel_width and/or abs_width")
+    master_seed = resolve_master_seed(params, master_seed)
+    workers = resolve_workers(workers)
+    batch = batch or max(min_replications, 4 * workers)
+
+    acc = {m: RunningStats() for m in metrics}
+    needed = {m: None for m in metrics}
+
+    def met(m):
+        s = acc[m]
+        if s.n < min(min_replications, max_replications) or s.n < 2:
+            return False
+        h = s.half_width()
+        a, r = _target(abs_width, m), _target(rel_width, m)
+        return (a is not None and h <= a) or (r is not None and h <= r * abs(s.mean))
+
+    n = 0
+    while n < max_replications and not all(met(m) for m in metrics):
+        size = min(batch, max_replications - n)
+        for stats in run_replications(params, n=size, master_seed=master_seed, workers=workers, start=n):
+            n += 1
+            row = summarize(stats)
+            for m in metrics:
+                acc[m].push(row[m])
+                # первое число реплик, при котором метрика достигла нужной точности
+                if needed[m] is None and met(m):
+                    needed[m] = n
+
+    report = {}
+    for m in metrics:
+        mean, lo, hi = acc[m].ci()
+        report[m] = {
+            "mean": mean,
+            "half_width": acc[m].half_width(),
+            "ci": (lo, hi),
+            "n": acc[m].n,
+            "replications_needed": needed[m],
+            "met": met(m),
+        }
+    return {
+        "replications": n,
+        "converged": all(met(m) for m in metrics),
+        "master_seed": master_seed,
+        "metrics": report,
+    }
+
+
+def run_summary(params, master_seed, index):
+    return summarize(run_replication(params, master_seed, index))
+
+
+def run_summaries(tasks, workers=None):
+    # tasks: список (params, master_seed, index) из разных сценариев -> сводки в том же порядке
+    tasks = list(tasks)
+    workers = min(resolve_workers(workers), max(1, len(tasks)))
+    if workers == 1:
+        return [run_summary(*task) for task in tasks]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_summary, *zip(*tasks), chunksize=chunksize))
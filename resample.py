@@ -0,0 +1,105 @@
+import numpy as np
+
+# ------------------------ ПЕРЕДИСКРЕТИЗАЦИЯ СТУПЕНЧАТЫХ РЯДОВ ------------------------
+# Ряд занятости — ступенчатая функция: значение values[k] действует на [times[k], times[k+1]).
+# До первой точки действует initial. Все средние здесь — точные средние по времени:
+# через накопленный интеграл A(x) и searchsorted, без построения pandas-объектов.
+
+
+def as_step_arrays(series):
+    # StepSeries / список (t, value) -> (times, values) float64; при равных временах — последнее
+    if hasattr(series, "times") and hasattr(series, "values"):
+        return np.asarray(series.times, dtype=float), np.asarray(series.values, dtype=float)
+    if len(series) == 0:
+        return np.empty(0), np.empty(0)
+    arr = np.asarray(series, dtype=float)
+    times, values = arr[:, 0], arr[:, 1]
+    keep = np.append(times[1:] != times[:-1], True)
+    return times[keep], values[keep]
+
+
+def step_values_at(times, values, grid, initial=0.0):
+    # значение ступенчатой функции в точках grid
+    if not len(times):
+        return np.full(np.shape(grid), float(initial))
+    idx = np.searchsorted(times, grid, side="right") - 1
+    return np.where(idx >= 0, np.asarray(values, dtype=float)[np.maximum(idx, 0)], initial)
+
+
+def _area(times, values, x, initial):
+    # A(x) = интеграл функции от times[0] до x (для x < times[0] — отрицательный)
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if not len(times):
+        return initial * x
+    cum = np.concatenate(([0.0], np.cumsum(values[:-1] * np.diff(times))))
+    idx = np.searchsorted(times, x, side="right") - 1
+    k = np.maximum(idx, 0)
+    inside = cum[k] + values[k] * (x - times[k])
+    return np.where(idx >= 0, inside, initial * (x - times[0]))
+
+
+def time_weighted_bins(times, values, edges, initial=0.0):
+    # среднее по времени в каждом интервале [edges[i], edges[i+1])
+    edges = np.asarray(edges, dtype=float)
+    a = _area(times, values, edges, initial)
+    return np.diff(a) / np.diff(edges)
+
+
+def sliding_time_average(times, values, grid, window, start=0.0, initial=0.0):
+    # скользящее среднее по времени за окно (g - window, g]; в начале окно обрезается по start
+    grid = np.asarray(grid, dtype=float)
+    lo = np.maximum(grid - window, start)
+    width = grid - lo
+    a_hi = _area(times, values, grid, initial)
+    a_lo = _area(times, values, lo, initial)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = (a_hi - a_lo) / width
+    return np.where(width > 0, avg, step_values_at(times, values, grid, initial))
+
+
+# ------------------------ ПАКЕТНАЯ ОБРАБОТКА РЕПЛИК ------------------------
+def _stack(series_list, lo, hi, initial):
+    # все ряды склеиваются в один отсортированный массив: ряд r сдвигается на r * span,
+    # в начало каждого сегмента ставится опорная точка со значением initial.
+    # Тогда один searchsorted отвечает на запросы по всем репликам сразу.
+    arrays = [as_step_arrays(s) for s in series_list]
+    t_min = min([lo] + [t[0] for t, _ in arrays if len(t)])
+    t_max = max([hi] + [t[-1] for t, _ in arrays if len(t)])
+    span = (t_max - t_min) + 1.0
+    base = t_min - 0.5
+    times, values = [], []
+    for r, (t, v) in enumerate(arrays):
+        offset = r * span
+        times.append(np.concatenate(([base + offset], t + offset)))
+        values.append(np.concatenate(([initial], v)))
+    return np.concatenate(times), np.concatenate(values), span
+
+
+def batch_time_weighted_bins(series_list, edges, initial=0.0):
+    # средние по интервалам для всех реплик одним вызовом -> массив (R, len(edges) - 1)
+    edges = np.asarray(edges, dtype=float)
+    if not len(series_list):
+        return np.empty((0, len(edges) - 1))
+    times, values, span = _stack(series_list, edges[0], edges[-1], initial)
+    offsets = np.arange(len(series_list))[:, None] * span
+    a = _area(times, values, edges[None, :] + offsets, initial)
+    return np.diff(a, axis=1) / np.diff(edges)
+
+
+def batch_sliding_time_average(series_list, grid, window, start=0.0, initial=0.0):
+    # скользящие средние по времени для всех реплик -> массив (R, len(grid))
+    grid = np.asarray(grid, dtype=float)
+    if not len(series_list):
+        return np.empty((0, len(grid)))
+    lo = np.maximum(grid - window, start)
+    width = grid - lo
+    times, values, span = _stack(series_list, min(start, grid.min()), grid.max(), initial)
+    offsets = np.arange(len(series_list))[:, None] * span
+    a_hi = _area(times, values, grid[None, :] + offsets, initial)
+    a_lo = _area(times, values, lo[None, :] + offsets, initial)
+    inst = step_values_at(times, values, grid[None, :] + offsets, initial)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = (a_hi - a_lo) / width
+    return np.where(width > 0, avg, inst)
@@ -1,3 +1,9 @@
+import contextlib
+import copy
+import io
+import os
+import random
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 import math
@@ -6,8 +12,26 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 from event import Event
+from fel import CalendarQueue, HeapEventList
 from newone import params, mean_ci, run_experiments, series_from_event_list
 from simulator import Simulation
+from replication import replication_seed, run_replication, run_replications, run_until_precision, summarize
+from streamstats import Histogram, P2Quantile, RunningStats
+from sweep import ResultStore, grid, latin_hypercube, run_sweep
+from columnar import ColumnStore, run_to_columns
+from analytic import mva_throughput, predict, prescreen, validate, validation_report
+from truck import IDLE, LOADING, TRAVELING, TRUCK_STATES, Fleet
+import live
+from multisite import lookahead, run_multisite
+from instrument import Observer, Profiler
+from snapshot import detect_warmup, mser5, restore, run_branches, take_snapshot, warm_up
+from resample import batch_sliding_time_average, batch_time_weighted_bins, sliding_time_average, time_weighted_bins
+from vecsim import run_lockstep, to_runs
+from variates import VariateStreams
+from recorder import StepSeries
+from orderbook import OrderBook, PriorityPolicy
+from tracelog import TraceLog, read_trace, render
+import tracelog
 
 
 class TestEvent(unittest.TestCase):
@@ -18,6 +42,45 @@ class TestEvent(unittest.TestCase):
         self.assertTrue(e1 < e2)
         self.assertFalse(e2 < e1)
 
+    def test_equal_time_keeps_creation_order(self):
+        # Проверка: при равном времени раньше идёт событие, созданное раньше
+        e1 = Event(1, "a", lambda: None)
+        e2 = Event(1, "b", lambda: None)
+        self.assertTrue(e1 < e2)
+        self.assertFalse(e2 < e1)
+
+
+class TestEventLists(unittest.TestCase):
+    def drain(self, q, seed):
+        # hold-прогон: каждое извлечённое событие планирует новое (часть — с нулевой задержкой)
+        rng = random.Random(seed)
+        for i in range(40):
+            q.push(rng.random() * 10, "x", None, (i,))
+        out = []
+        while q:
+            ev = q.pop()
+            out.append(ev[:2])
+            if len(out) < 2000:
+                for _ in range(rng.choice([0, 1, 2])):
+                    q.push(ev[0] + rng.choice([0.0, 1.0, rng.expovariate(1.0)]), "x", None)
+        return out
+
+    def test_order_is_time_then_sequence(self):
+        # Проверка: обе реализации выдают события в порядке (время, номер) и совпадают
+        heap = self.drain(HeapEventList(), 1)
+        calendar = self.drain(CalendarQueue(nbuckets=2), 1)
+        self.assertEqual(heap, sorted(heap))
+        self.assertEqual(heap, calendar)
+
+    def test_zero_delay_lane_after_earlier_same_time(self):
+        # Проверка: событие быстрой полосы не обгоняет ранее запланированное на тот же момент
+        q = HeapEventList()
+        q.push(1.0, "a", None)
+        q.push(1.0, "b", None)
+        self.assertEqual(q.pop()[2], "a")
+        q.push(1.0, "c", None)
+        self.assertEqual([q.pop()[2], q.pop()[2]], ["b", "c"])
+
 
 class TestSimulation(unittest.TestCase):
     def setUp(self):
@@ -118,6 +181,872 @@ class TestFunctions(unittest.TestCase):
         self.assertTrue((s == 0).all())
 
 
+class TestStepSeries(unittest.TestCase):
+    def test_only_changes_are_stored(self):
+        # Проверка: повторы значения не сохраняются, в один момент остаётся последнее значение
+        s = StepSeries(capacity=2)
+        for t, v in [(0, 0), (1, 0), (2, 1), (2, 2), (3, 2), (4, 1), (4, 2), (5, 3)]:
+            s.append(t, v)
+        self.assertEqual(list(s), [(0, 0), (2, 2), (5, 3)])
+        self.assertTrue((s.times == np.array([0, 2, 5])).all())
+        self.assertTrue((s.values == np.array([0, 2, 3])).all())
+
+    def test_views_survive_growth(self):
+        # Проверка: numpy-представления, взятые по ходу прогона, не мешают росту буфера
+        p = dict(params, tracing=False, MAX_ORDERS=2000, SIM_TIME=100000)
+        full = Simulation(p, rng=random.Random(2))
+        full.start()
+        sim = Simulation(p, rng=random.Random(2))
+        views = []
+        for _ in sim.run_iter(500):
+            views.append(sim.stats["busy_trucks"].times)
+        self.assertGreater(len(full.stats["busy_trucks"]), 1024)
+        self.assertEqual(sim.stats, full.stats)
+        early = views[0]
+        self.assertTrue((early == full.stats["busy_trucks"].times[: len(early)]).all())
+
+    def test_history_can_be_disabled(self):
+        # Проверка: без истории остаются только интегралы занятости
+        p = params.copy()
+        p.update(tracing=False, record_history=False)
+        sim = Simulation(p)
+        sim.start()
+        self.assertEqual(len(sim.stats["busy_trucks"]), 0)
+        self.assertIn("utilization", sim.stats)
+
+
+class LargestFirst(PriorityPolicy):
+    # пользовательская политика для тестов: сначала самый большой заказ
+    def key(self, order):
+        return -order["required"]
+
+
+class ScaledPolicy(PriorityPolicy):
+    # политика с аргументом конструктора
+    def __init__(self, scale):
+        super().__init__()
+        self.scale = scale
+
+    def key(self, order):
+        return self.scale * order["required"]
+
+
+class TestOrderBook(unittest.TestCase):
+    def orders(self):
+        return {
+            0: {"required": 7, "done": 0, "start": 0, "deadline": 90},
+            1: {"required": 3, "done": 0, "start": 5, "deadline": 30},
+            2: {"required": 5, "done": 4, "start": 9, "deadline": 60},
+        }
+
+    def test_fifo_next_and_completion(self):
+        # Проверка: FIFO отдаёт самый ранний незавершённый заказ, завершённый исчезает из очереди
+        book = OrderBook("fifo", self.orders())
+        self.assertEqual(book.next_pending(), 0)
+        book.progress(0, 8)
+        self.assertEqual(book.next_pending(), 1)
+        self.assertIn(0, book)
+        del book[1]
+        del book[2]
+        self.assertFalse(book.has_pending())
+        self.assertIsNone(book.next_pending())
+
+    def test_custom_policy_factory(self):
+        # Проверка: пользовательская политика задаётся классом или фабрикой, у каждой книги
+        # (и каждого прогона) — свой экземпляр; готовый объект не принимается
+        import functools
+
+        sim = Simulation(dict(params, tracing=False, dispatch_policy=LargestFirst))
+        sim.active_orders = self.orders()
+        self.assertIsInstance(sim.order_book.policy, LargestFirst)
+        self.assertEqual(sim.order_book.next_pending(), 0)
+
+        p = dict(params, tracing=False, MAX_ORDERS=20, dispatch_policy=functools.partial(ScaledPolicy, -1))
+        policies = []
+        for seed in range(3):
+            run = Simulation(p, rng=random.Random(seed))
+            run.start()
+            policies.append(run.order_book.policy)
+        self.assertEqual(len({id(x) for x in policies}), 3)
+        self.assertEqual(Simulation(p).order_book.policy.scale, -1)
+        with self.assertRaises(ValueError):
+            OrderBook(LargestFirst())
+
+    def test_priority_policies(self):
+        # Проверка политик «меньше всего осталось» и «ближайший срок»
+        srpt = OrderBook("shortest_remaining", self.orders())
+        self.assertEqual(srpt.next_pending(), 2)
+        srpt.progress(0, 6)
+        self.assertEqual(srpt.next_pending(), 0)
+        edd = OrderBook("earliest_deadline", self.orders())
+        self.assertEqual(edd.next_pending(), 1)
+
+    def test_simulation_uses_policy(self):
+        # Проверка: политика диспетчеризации задаётся параметром и прогон завершается
+        p = params.copy()
+        p.update(tracing=False, dispatch_policy="shortest_remaining")
+        sim = Simulation(p, rng=random.Random(0))
+        sim.start()
+        self.assertEqual(sim.active_orders.policy.name, "shortest_remaining")
+        self.assertGreater(sim.stats["trips"], 0)
+
+
+class TestTraceLog(unittest.TestCase):
+    def test_ring_buffer_keeps_latest_records(self):
+        # Проверка: при переполнении кольца остаются последние записи в исходном порядке
+        log = TraceLog(capacity=3)
+        busy = {"trucks": 1, "loaders": 0, "bulldozer": 1}
+        for i in range(5):
+            log.emit(float(i), tracelog.NEW_ORDER, i, 3, busy)
+        self.assertEqual([r[2] for r in log.records()], [2, 3, 4])
+        self.assertEqual(next(render(log.records())), "[2.0] Новый заказ 2: 3 куч")
+
+    def test_binary_file_reproduces_text_log(self):
+        # Проверка: журнал из двоичного файла совпадает с текстовой трассировкой
+        p = params.copy()
+        p["tracing"] = True
+        text = io.StringIO()
+        with contextlib.redirect_stdout(text):
+            Simulation(p, rng=random.Random(3)).start()
+        with tempfile.TemporaryDirectory() as d:
+            p.update(tracing=False, trace_file=os.path.join(d, "trace.bin"))
+            Simulation(p, rng=random.Random(3)).start()
+            lines = list(render(read_trace(p["trace_file"])))
+        self.assertEqual(lines, text.getvalue().splitlines())
+
+    def test_replications_write_separate_trace_files(self):
+        # Проверка: у каждой реплики свой файл журнала, и он совпадает с одиночным прогоном
+        with tempfile.TemporaryDirectory() as d:
+            p = params.copy()
+            p.update(tracing=False, trace_file=os.path.join(d, "trace.bin"), SIM_TIME=2000)
+            run_replications(p, n=2, master_seed=5, workers=1)
+            self.assertEqual(sorted(os.listdir(d)), ["trace.r0000.bin", "trace.r0001.bin"])
+            first = read_trace(os.path.join(d, "trace.r0000.bin"))
+            second = read_trace(os.path.join(d, "trace.r0001.bin"))
+            self.assertNotEqual(first, second)
+            single = dict(p, trace_file=os.path.join(d, "single.bin"))
+            run_replication(single, 5, 1)
+            self.assertEqual(read_trace(os.path.join(d, "single.r0001.bin")), second)
+
+    def test_close_is_idempotent(self):
+        # Проверка: повторное закрытие файлового журнала не падает
+        with tempfile.TemporaryDirectory() as d:
+            log = TraceLog(capacity=4, path=os.path.join(d, "t.bin"))
+            log.emit(1.0, tracelog.NEW_ORDER, 1, 2, {"trucks": 0, "loaders": 0, "bulldozer": 0})
+            log.close()
+            log.close()
+            self.assertEqual(len(read_trace(os.path.join(d, "t.bin"))), 1)
+
+    def test_disabled_tracing_has_no_tracer(self):
+        # Проверка: без трассировки объект журнала не создаётся
+        p = params.copy()
+        p["tracing"] = False
+        self.assertIsNone(Simulation(p).tracer)
+
+
+class TestReplications(unittest.TestCase):
+    def setUp(self):
+        self.params = params.copy()
+        self.params["tracing"] = False
+        self.params["N_REPLICATIONS"] = 4
+
+    def test_seeds_are_distinct_and_stable(self):
+        # Проверка: зерно зависит только от главного зерна и номера реплики
+        self.assertEqual(replication_seed(1, 0), replication_seed(1, 0))
+        self.assertNotEqual(replication_seed(1, 0), replication_seed(1, 1))
+
+    def test_results_do_not_depend_on_workers(self):
+        # Проверка побитовой воспроизводимости при разном числе процессов
+        serial = run_replications(self.params, master_seed=7, workers=1)
+        parallel = run_replications(self.params, master_seed=7, workers=2)
+        self.assertEqual(serial, parallel)
+        self.assertNotEqual(serial[0], serial[1])
+
+
+class TestVariateStreams(unittest.TestCase):
+    def test_streams_are_reproducible_and_independent(self):
+        # Проверка: те же (зерно, реплика) дают те же величины, разные активности — разные
+        a, b = VariateStreams(5, 2, block=8), VariateStreams(5, 2, block=8)
+        draws = [a.expo("loading", 10) for _ in range(100)]
+        self.assertEqual(draws, [b.expo("loading", 10) for _ in range(100)])
+        self.assertNotEqual(draws[:5], [a.expo("travel", 10) for _ in range(5)])
+        sizes = {a.randint("order_size", 3, 7) for _ in range(500)}
+        self.assertEqual(sizes, {3, 4, 5, 6, 7})
+
+    def test_common_random_numbers_reduce_difference_variance(self):
+        # Проверка: при общих случайных числах разброс разности сценариев заметно меньше
+        base = params.copy()
+        base.update(tracing=False)
+        other = dict(base, loading_time_mean=12)
+        spread = {}
+        for crn in (False, True):
+            a = run_replications(dict(base, common_random_numbers=crn), n=60, master_seed=4, workers=1)
+            b = run_replications(dict(other, common_random_numbers=crn), n=60, master_seed=4, workers=1)
+            d = [x["avg_prep_time_mean"] - y["avg_prep_time_mean"] for x, y in zip(a, b)]
+            spread[crn] = np.std(d)
+        self.assertLess(spread[True], spread[False] / 2)
+
+
+class TestLockstep(unittest.TestCase):
+    def test_matches_scalar_simulation(self):
+        # Проверка: средние метрики векторного движка совпадают со скалярным в пределах 4 ст. ошибок
+        p = params.copy()
+        p["tracing"] = False
+        scalar = run_replications(p, n=300, master_seed=11, workers=1)
+        vec = run_lockstep(p, 3000, seed=11)
+        for key in ("delivered_heaps", "trips", "avg_prep_time_mean"):
+            a = np.array([r[key] for r in scalar], dtype=float)
+            b = vec[key]
+            se = (a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b)) ** 0.5
+            self.assertLess(abs(a.mean() - b.mean()), 4 * se + 1e-9, key)
+        for r in ("loaders", "trucks"):
+            a = np.array([x["utilization"][r] for x in scalar])
+            b = vec["utilization"][r]
+            se = (a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b)) ** 0.5
+            self.assertLess(abs(a.mean() - b.mean()), 4 * se + 1e-9, r)
+
+    def test_to_runs_shape(self):
+        # Проверка: результаты переводятся в список словарей как у Simulation.stats
+        p = params.copy()
+        runs = to_runs(run_lockstep(p, 5, seed=0))
+        self.assertEqual(len(runs), 5)
+        self.assertEqual(set(runs[0]["utilization"]), {"bulldozer", "loaders", "trucks"})
+        self.assertEqual(runs[0]["orders_completed"], p["MAX_ORDERS"])
+
+
+class TestStreamingStats(unittest.TestCase):
+    def test_p2_quantile_and_histogram(self):
+        # Проверка: P²-оценка близка к точному квантилю, гистограмма учитывает все значения
+        rng = random.Random(0)
+        xs = [rng.expovariate(0.01) for _ in range(5000)]
+        est, hist = P2Quantile(0.95), Histogram(0, 500, 10)
+        for x in xs:
+            est.push(x)
+            hist.push(x)
+        self.assertAlmostEqual(est.value, np.quantile(xs, 0.95), delta=15)
+        self.assertEqual(sum(hist.counts) + hist.underflow + hist.overflow, len(xs))
+
+    def test_simulation_streaming_mode(self):
+        # Проверка: потоковый режим даёт те же средние без накопления списков
+        p = params.copy()
+        p.update(tracing=False, MAX_ORDERS=200)
+        plain = Simulation(p, rng=random.Random(1))
+        plain.start()
+        p["streaming_stats"] = True
+        stream = Simulation(p, rng=random.Random(1))
+        stream.start()
+        self.assertAlmostEqual(stream.stats["avg_prep_time_mean"], plain.stats["avg_prep_time_mean"])
+        self.assertEqual(stream.stats["avg_prep_time"], [])
+        self.assertEqual(len(stream.stats["busy_trucks"]), 0)
+        self.assertEqual(stream.orders, [])
+        self.assertEqual(stream.stats["prep_time"]["n"], plain.stats["orders_completed"])
+        occ = stream.stats["occupancy"]["trucks"]
+        self.assertAlmostEqual(occ["mean"] * stream.occupancy["trucks"].total_time, plain.area_busy["trucks"])
+        self.assertGreater(occ["var"], 0)
+
+
+class TestSequentialReplications(unittest.TestCase):
+    def test_running_stats_match_mean_ci(self):
+        # Проверка: потоковая статистика даёт тот же интервал, что и mean_ci
+        vals = [3.0, 7.5, 1.25, 9.0, 4.0]
+        acc = RunningStats()
+        for v in vals + [float("nan")]:
+            acc.push(v)
+        for a, b in zip(acc.ci(), mean_ci(vals)):
+            self.assertAlmostEqual(a, b)
+        left, right = RunningStats(), RunningStats()
+        for v in vals[:2]:
+            left.push(v)
+        for v in vals[2:]:
+            right.push(v)
+        self.assertAlmostEqual(left.merge(right).variance, acc.variance)
+
+    def test_stops_at_target_width(self):
+        # Проверка: прогон останавливается, когда все метрики достигли нужной точности
+        p = params.copy()
+        p["tracing"] = False
+        rep = run_until_precision(p, metrics=("trips",), rel_width=0.05, batch=5, master_seed=2, workers=1)
+        self.assertTrue(rep["converged"])
+        trips = rep["metrics"]["trips"]
+        self.assertLessEqual(trips["half_width"], 0.05 * trips["mean"])
+        self.assertLessEqual(trips["replications_needed"], rep["replications"])
+
+    def test_budget_cap(self):
+        # Проверка: при недостижимой точности число реплик ограничено бюджетом
+        p = params.copy()
+        p["tracing"] = False
+        rep = run_until_precision(p, metrics=("avg_prep_time",), abs_width=1e-6, max_replications=12, master_seed=2, workers=1)
+        self.assertFalse(rep["converged"])
+        self.assertEqual(rep["replications"], 12)
+        self.assertIsNone(rep["metrics"]["avg_prep_time"]["replications_needed"])
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.params = params.copy()
+        self.params["tracing"] = False
+
+    def test_fleet_size_is_a_parameter(self):
+        # Проверка: состав техники задаётся параметрами
+        p = dict(self.params, n_bulldozers=2, n_loaders=3, n_trucks=6)
+        sim = Simulation(p, rng=random.Random(0))
+        sim.start()
+        self.assertEqual(sim.resources, {"bulldozer": 2, "loaders": 3, "trucks": 6})
+        self.assertLessEqual(max(v for _, v in sim.stats["busy_trucks"]), 6)
+        self.assertEqual(max(v for _, v in sim.stats["bulldozer_busy"]), 2)
+
+    def test_designs(self):
+        # Проверка построения сетки и латинского гиперкуба
+        self.assertEqual(len(grid({"n_trucks": [2, 4], "n_loaders": [1, 2, 3]})), 6)
+        pts = latin_hypercube({"n_trucks": (2, 8), "loading_time_mean": (5.0, 15.0)}, 7, seed=1)
+        self.assertEqual(sorted(p["n_trucks"] for p in pts), list(range(2, 9)))
+        self.assertTrue(all(5.0 <= p["loading_time_mean"] <= 15.0 for p in pts))
+        # целые границы включительно: оба конца достижимы
+        values = {p["n_loaders"] for p in latin_hypercube({"n_loaders": (1, 3)}, 30, seed=2)}
+        self.assertEqual(values, {1, 2, 3})
+
+    def test_only_missing_results_are_simulated(self):
+        # Проверка: повторный прогон плана моделирует только новые точки и реплики
+        with tempfile.TemporaryDirectory() as d:
+            store = ResultStore(d)
+            first = run_sweep(self.params, grid({"n_trucks": [2, 4]}), 3, master_seed=1, store=store, workers=1)
+            self.assertEqual((first["simulated"], first["cached"]), (6, 0))
+            second = run_sweep(self.params, grid({"n_trucks": [2, 4, 6]}), 4, master_seed=1, store=store, workers=1)
+            self.assertEqual((second["simulated"], second["cached"]), (6, 6))
+            fresh = run_sweep(self.params, grid({"n_trucks": [2, 4, 6]}), 4, master_seed=1, workers=1)
+            self.assertEqual(
+                [r["summaries"] for r in second["results"]], [r["summaries"] for r in fresh["results"]]
+            )
+
+
+class TestResample(unittest.TestCase):
+    def test_exact_time_weighted_bins(self):
+        # Проверка: среднее по интервалу взвешено по времени, а не по числу точек
+        t, v = np.array([0.0, 1.0, 3.0]), np.array([2.0, 0.0, 4.0])
+        bins = time_weighted_bins(t, v, [0.0, 2.0, 4.0])
+        self.assertTrue(np.allclose(bins, [1.0, 2.0]))
+        roll = sliding_time_average(t, v, [0.5, 4.0], window=2.0)
+        self.assertTrue(np.allclose(roll, [2.0, 2.0]))
+
+    def test_batch_matches_single_series(self):
+        # Проверка: пакетный вызов по всем репликам совпадает с поштучным
+        p = params.copy()
+        p["tracing"] = False
+        series = [r["busy_trucks"] for r in run_replications(p, n=6, master_seed=3, workers=1)]
+        series.append([])
+        edges = np.linspace(0, 800, 17)
+        batch = batch_time_weighted_bins(series, edges)
+        for row, s in zip(batch, series):
+            t, v = (s.times, s.values) if len(s) else (np.empty(0), np.empty(0))
+            self.assertTrue(np.allclose(row, time_weighted_bins(t, v, edges)))
+        grid_ = np.linspace(0, 800, 41)
+        roll = batch_sliding_time_average(series, grid_, 50.0)
+        self.assertTrue(np.allclose(roll[0], sliding_time_average(series[0].times, series[0].values, grid_, 50.0)))
+        self.assertTrue((roll[-1] == 0).all())
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.params = params.copy()
+        self.params.update(tracing=False, MAX_ORDERS=200, SIM_TIME=20000)
+
+    def test_restored_run_continues_identically(self):
+        # Проверка: прогон, восстановленный из сериализованного снимка, совпадает с исходным
+        import pickle
+        for extra in ({}, {"common_random_numbers": True, "event_list": "calendar"}):
+            p = dict(self.params, **extra)
+            sim = Simulation(p, rng=random.Random(4), variates=None)
+            if extra:
+                from variates import VariateStreams
+                sim.variates = VariateStreams(4, 0)
+            sim.initialize()
+            sim.run(until=2500)
+            snap = pickle.loads(pickle.dumps(take_snapshot(sim)))
+            sim.run()
+            sim.finish()
+            copy_ = restore(snap)
+            copy_.run()
+            copy_.finish()
+            self.assertEqual(copy_.stats, sim.stats)
+
+    def test_snapshot_with_custom_policy(self):
+        # Проверка: снимок с пользовательской политикой (не из реестра) восстанавливается
+        import functools
+        import pickle
+        for policy in (LargestFirst, functools.partial(ScaledPolicy, -1)):
+            p = dict(self.params, dispatch_policy=policy)
+            sim = Simulation(p, rng=random.Random(4))
+            sim.initialize()
+            sim.run(until=2500)
+            snap = pickle.loads(pickle.dumps(take_snapshot(sim)))
+            sim.run()
+            sim.finish()
+            copy_ = restore(snap)
+            self.assertIsInstance(copy_.order_book.policy, PriorityPolicy)
+            copy_.run()
+            copy_.finish()
+            self.assertEqual(copy_.stats, sim.stats)
+
+    def test_branches_from_warm_snapshot(self):
+        # Проверка: реплики от прогретого снимка различаются и не зависят от числа процессов
+        snap = warm_up(self.params, 1000, master_seed=3)
+        self.assertEqual(snap["stats"]["trips"], 0)
+        self.assertGreater(snap["busy"]["trucks"] + snap["heaps"], 0)
+        serial = run_branches(snap, 4, master_seed=8, workers=1)
+        self.assertEqual(serial, run_branches(snap, 4, master_seed=8, workers=2))
+        self.assertNotEqual(serial[0]["trips"], serial[1]["trips"])
+        self.assertLessEqual(serial[0]["utilization"]["trucks"], 1.0)
+
+    def test_warm_start_measures_the_cold_model(self):
+        # Проверка: после прогрева бюджет заказов считается заново — реплики доходят до
+        # остановки по MAX_ORDERS и дают те же показатели, что длинный холодный прогон
+        p = dict(self.params, SIM_TIME=50000)
+        warm = [summarize(s) for s in run_branches(warm_up(p, 300, master_seed=3), 6, master_seed=8, workers=1)]
+        cold = [summarize(s) for s in run_replications(p, n=6, master_seed=8, workers=1)]
+        self.assertTrue(all(r["orders_completed"] == p["MAX_ORDERS"] for r in warm))
+        for m in ("trips", "trucks_util", "avg_prep_time"):
+            w, c = np.mean([r[m] for r in warm]), np.mean([r[m] for r in cold])
+            self.assertLess(abs(w - c) / c, 0.1, m)
+
+    def test_warm_start_with_common_random_numbers(self):
+        # Проверка: прогрев с CRN идёт по своим потокам, реплики от снимка воспроизводимы
+        p = dict(self.params, common_random_numbers=True)
+        snap = warm_up(p, 1000, master_seed=3)
+        self.assertGreater(snap["busy"]["trucks"] + snap["heaps"], 0)
+        first = run_branches(snap, 2, master_seed=3, workers=1)
+        self.assertEqual(first, run_branches(warm_up(p, 1000, master_seed=3), 2, master_seed=3, workers=1))
+        self.assertNotEqual(first[0]["trips"], first[1]["trips"])
+        from variates import VariateStreams
+        warm, rep0 = VariateStreams(3, None), VariateStreams(3, 0)
+        self.assertNotEqual(warm.streams["travel"](), rep0.streams["travel"]())
+
+    def test_mser5_finds_transient(self):
+        # Проверка: MSER-5 отсекает начальный переходный участок
+        rng = random.Random(0)
+        values = [10.0 - i * 0.1 for i in range(100)] + [rng.gauss(0, 0.5) for _ in range(400)]
+        cut = mser5(values)
+        self.assertTrue(80 <= cut <= 150)
+        # отсечка кратна пачке из 5 интервалов: первые 5 интервалов по 5 единиц времени
+        self.assertEqual(detect_warmup([(0, 0), (10, 1)], 100, bins=20), 25.0)
+
+
+class TestFleet(unittest.TestCase):
+    def test_idle_pool_and_residency(self):
+        # Проверка: выдаётся дольше всех простаивавшая единица, время по состояниям копится
+        fleet = Fleet(3, TRUCK_STATES)
+        a = fleet.acquire(0.0, LOADING, order_id=7)
+        b = fleet.acquire(2.0, LOADING)
+        self.assertEqual((a, b, fleet.available), (0, 1, 1))
+        fleet.set_state(a, TRAVELING, 4.0)
+        fleet.release(a, 10.0)
+        self.assertEqual(fleet.acquire(11.0, LOADING), 2)
+        self.assertEqual(fleet.acquire(12.0, LOADING), 0)
+        self.assertEqual(fleet.residency_of(a)["traveling"], 6.0)
+        self.assertEqual(fleet.cycles[a], 1)
+        self.assertEqual(fleet.state[1], LOADING)
+        self.assertEqual(fleet.utilization(20.0), [1.0 - 2.0 / 20, 1.0 - 2.0 / 20, 1.0 - 11.0 / 20])
+        self.assertEqual(fleet.max_idle[2], 11.0)
+
+    def test_entity_tracking_matches_aggregate(self):
+        # Проверка: поштучный учёт не меняет результатов и сходится с агрегатной загрузкой
+        p = params.copy()
+        p.update(tracing=False, MAX_ORDERS=200, SIM_TIME=20000, n_trucks=12, n_loaders=3)
+        plain = Simulation(p, rng=random.Random(5))
+        plain.start()
+        sim = Simulation(dict(p, entity_tracking=True), rng=random.Random(5))
+        sim.start()
+        fleet = sim.stats.pop("fleet")
+        self.assertEqual(sim.stats, plain.stats)
+        for name, resource in (("trucks", "trucks"), ("loaders", "loaders")):
+            util = fleet[name]["utilization"]
+            self.assertAlmostEqual(sum(util) / len(util), plain.stats["utilization"][resource], places=2)
+        self.assertEqual(sum(fleet["trucks"]["cycles"]), plain.stats["trips"])
+        self.assertTrue(all(state == IDLE or sim.trucks.order[i] >= 0 for i, state in enumerate(sim.trucks.state)))
+
+
+class TestRunIter(unittest.TestCase):
+    def setUp(self):
+        self.params = params.copy()
+        self.params.update(tracing=False, MAX_ORDERS=150, SIM_TIME=10000)
+        self.full = Simulation(self.params, rng=random.Random(6))
+        self.full.start()
+
+    def test_windows_match_full_run(self):
+        # Проверка: пошаговый прогон даёт в точности ту же статистику, что start()
+        sim = Simulation(self.params, rng=random.Random(6))
+        records = list(sim.run_iter(250))
+        self.assertEqual(sim.stats, self.full.stats)
+        self.assertEqual(records[0]["t0"], 0.0)
+        self.assertEqual([r["t0"] for r in records[1:]], [r["t"] for r in records[:-1]])
+        self.assertEqual(sum(r["window_trips"] for r in records), sim.stats["trips"])
+        self.assertTrue(all(-1e-9 <= r["mean_busy"]["trucks"] <= 4 + 1e-9 for r in records))
+
+    def test_pause_resume_and_stop(self):
+        # Проверка: пауза по времени с продолжением и остановка по числу заказов
+        sim = Simulation(self.params, rng=random.Random(6))
+        first = list(sim.run_iter(100, until=1000))
+        self.assertEqual(first[-1]["t"], 1000)
+        self.assertNotIn("utilization", sim.stats)
+        second = list(sim.run_iter(300))
+        self.assertEqual(second[0]["t0"], first[-1]["t"])
+        self.assertEqual(second[0]["t"], 1300)
+        self.assertEqual(sim.stats, self.full.stats)
+
+        stopped = Simulation(self.params, rng=random.Random(6))
+        records = list(stopped.run_iter(500, stop_orders=5))
+        self.assertEqual(stopped.stats["orders_completed"], 5)
+        self.assertTrue(records[-1]["stopped"])
+        self.assertIn("utilization", stopped.stats)
+
+    def test_finished_run_is_not_finished_again(self):
+        # Проверка: run_iter и finish после завершения ничего не меняют и не падают
+        with tempfile.TemporaryDirectory() as d:
+            p = dict(self.params, trace_file=os.path.join(d, "trace.bin"))
+            sim = Simulation(p, rng=random.Random(6))
+            list(sim.run_iter(500))
+            stats = copy.deepcopy(sim.stats)
+            self.assertEqual(list(sim.run_iter(500)), [])
+            sim.finish()
+            self.assertEqual(sim.stats, stats)
+            self.assertEqual(len(read_trace(p["trace_file"])), sim.tracer.count)
+
+    def test_async_streams_interleave(self):
+        # Проверка: несколько прогонов в одном цикле asyncio, результаты как у start()
+        import asyncio
+
+        sims = [Simulation(self.params, rng=random.Random(6)) for _ in range(3)]
+
+        async def consume():
+            return [item async for item in live.stream_many(sims, 1000, maxsize=2)]
+
+        items = asyncio.run(consume())
+        order = [i for i, _ in items]
+        self.assertEqual(sorted(set(order)), [0, 1, 2])
+        self.assertNotEqual(order, sorted(order))
+        for sim in sims:
+            self.assertEqual(sim.stats, self.full.stats)
+
+
+class TestMultiSite(unittest.TestCase):
+    def setUp(self):
+        self.params = params.copy()
+        self.params.update(
+            tracing=False,
+            SIM_TIME=8000,
+            MAX_ORDERS=1000,
+            transfer_time=[[20, 60, 90], [60, 20, 45], [90, 45, 20]],
+            transfer_jitter_mean=10,
+            sites=[
+                {"n_loaders": 2, "initial_trucks": 4},
+                {"n_loaders": 1, "initial_trucks": 2},
+                {"n_bulldozers": 2, "n_loaders": 3, "initial_trucks": 6},
+            ],
+        )
+
+    def test_parallel_matches_sequential(self):
+        # Проверка: результат не зависит ни от числа процессов, ни от ширины окна
+        serial = run_multisite(self.params, master_seed=7, workers=1)
+        self.assertEqual(serial["lookahead"], 20.0)
+        self.assertGreater(serial["messages"], 0)
+        self.assertEqual(run_multisite(self.params, master_seed=7, workers=2), serial)
+        narrow = run_multisite(self.params, master_seed=7, workers=1, window=7.5)
+        self.assertGreater(narrow["windows"], serial["windows"])
+        self.assertEqual(narrow["sites"], serial["sites"])
+
+    def test_trucks_are_conserved(self):
+        # Проверка: самосвалы не теряются — на площадках, под погрузкой или в пути
+        res = run_multisite(self.params, master_seed=3)
+        on_sites = sum(s["idle_trucks"] + s["loading_trucks"] for s in res["sites"])
+        self.assertEqual(on_sites + res["in_transit"], 12)
+        self.assertEqual(sum(s["trucks_out"] for s in res["sites"]), res["messages"])
+
+    def test_lookahead_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            lookahead(dict(self.params, transfer_time=0))
+
+    def test_single_site_counts_like_simulation(self):
+        # Проверка: одна площадка считает доставленные кучи как Simulation (4 на рейс)
+        p = dict(self.params, SIM_TIME=5000, transfer_time=1, transfer_jitter_mean=0)
+        p["sites"] = [{"initial_trucks": p["n_trucks"]}]
+        site = [run_multisite(p, master_seed=s)["totals"] for s in range(8)]
+        plain = []
+        for s in range(8):
+            sim = Simulation(p, rng=random.Random(s))
+            sim.start()
+            plain.append(sim.stats)
+        for stats in site + plain:
+            # +2 за самосвалы, прибывшие к заказчику, но ещё не разгрузившиеся
+            self.assertTrue(0 <= stats["delivered_heaps"] - 4 * stats["trips"] <= 2 * p["n_trucks"])
+        site_mean = np.mean([s["delivered_heaps"] for s in site])
+        plain_mean = np.mean([s["delivered_heaps"] for s in plain])
+        self.assertAlmostEqual(site_mean / plain_mean, 1.0, delta=0.05)
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.params = params.copy()
+        self.params.update(tracing=False, MAX_ORDERS=100, SIM_TIME=10000)
+
+    def test_profiled_run_matches_plain_run(self):
+        # Проверка: профилирование не меняет результатов, счётчики сходятся с числом событий
+        plain = Simulation(self.params, rng=random.Random(2))
+        plain.start()
+        profiler = Profiler(fel_every=10)
+        sim = Simulation(self.params, rng=random.Random(2))
+        sim.start(observers=[profiler])
+        self.assertEqual(sim.stats, plain.stats)
+        processed = sim.events.scheduled - len(sim.events)
+        self.assertEqual(profiler.events, processed)
+        self.assertEqual(sum(p.count for p in profiler.handlers.values()), processed)
+        self.assertIn("truck_return", profiler.handlers)
+        self.assertEqual(len(profiler.fel_sizes), processed // 10)
+        self.assertGreater(profiler.events_per_second, 0)
+
+    def test_exports(self):
+        # Проверка: JSON и collapsed stacks для flamegraph
+        import json
+        profiler = Profiler()
+        Simulation(self.params, rng=random.Random(2)).start(observers=[profiler])
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "profile.json")
+            profiler.to_json(path)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data["events"], profiler.events)
+        self.assertIn("p95_us", data["handlers"]["loading_done"])
+        lines = profiler.collapsed().splitlines()
+        self.assertIn("simulation;run;record_state", [line.rsplit(" ", 1)[0] for line in lines])
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+    def test_custom_observer(self):
+        # Проверка: собственный наблюдатель видит события в порядке времени
+        class Times(Observer):
+            def __init__(self):
+                self.times = []
+
+            def before_event(self, sim, time, event_type):
+                self.times.append(time)
+
+        obs = Times()
+        Simulation(self.params, rng=random.Random(2), observers=[obs]).start()
+        self.assertTrue(obs.times)
+        self.assertEqual(obs.times, sorted(obs.times))
+
+
+class TestCommandLine(unittest.TestCase):
+    def test_import_is_light(self):
+        # Проверка: импорт модели и newone не запускает эксперимент и не тянет numpy/pandas/matplotlib
+        import subprocess
+        import sys
+        code = "import sys, newone; print(sorted(m for m in ('numpy', 'pandas', 'matplotlib') if m in sys.modules))"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.strip(), "[]")
+        self.assertFalse(params["tracing"])
+
+    def test_main_writes_metrics_and_plots(self):
+        # Проверка: параметры из файла и флагов, метрики в JSON, графики в файлы
+        import json
+        from main import main
+        with tempfile.TemporaryDirectory() as d:
+            param_file = os.path.join(d, "params.json")
+            with open(param_file, "w") as f:
+                json.dump({"MAX_ORDERS": 15, "n_trucks": 3}, f)
+            out = os.path.join(d, "result.json")
+            with contextlib.redirect_stdout(io.StringIO()) as buf:
+                code = main(["--params", param_file, "-n", "2", "--set", "SIM_TIME=3000",
+                             "--output", out, "--plot-dir", os.path.join(d, "plots")])
+            self.assertEqual(code, 0)
+            with open(out) as f:
+                data = json.load(f)
+            self.assertEqual(data["params"]["n_trucks"], 3)
+            self.assertEqual(data["params"]["SIM_TIME"], 3000)
+            self.assertEqual(len(data["replications"]), 2)
+            self.assertIn("trips_mean_ci", data["metrics"])
+            self.assertEqual(sorted(os.listdir(os.path.join(d, "plots"))),
+                             ["bulldozer_busy.png", "busy_loaders.png", "busy_trucks.png"])
+            self.assertIn("Aggregated metrics", buf.getvalue())
+
+    def test_output_is_strict_json_without_completed_orders(self):
+        # Проверка: NaN (ни одного завершённого заказа) пишется как null, файл — строгий JSON
+        import json
+        from main import main
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, "result.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(["-n", "2", "--set", "SIM_TIME=5", "--output", out])
+            with open(out) as f:
+                data = json.load(f, parse_constant=lambda c: self.fail(f"non-standard constant {c}"))
+            self.assertEqual(data["metrics"]["avg_prep_time_mean_ci"], [None, None, None])
+            self.assertIsNone(data["replications"][0]["avg_prep_time"])
+
+
+class TestBenchmarkBaseline(unittest.TestCase):
+    def test_compare_flags_slowdown_over_threshold(self):
+        # Проверка: регрессией считается замедление больше порога, новые замеры не сравниваются
+        from benchmarks.bench_suite import compare
+        baseline = {"cases": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}}}
+        current = {"cases": {"a": {"seconds": 1.05}, "b": {"seconds": 1.3}, "c": {"seconds": 9.0}}}
+        regressions = compare(current, baseline, threshold=10)
+        self.assertEqual([r[0] for r in regressions], ["b"])
+        self.assertAlmostEqual(regressions[0][3], 30.0)
+
+    def test_missing_baseline_fails_check(self):
+        # Проверка: без базовой линии проверка завершается ошибкой, а не «нет регрессий»
+        from benchmarks.bench_suite import BASELINE, main
+        self.assertTrue(os.path.exists(BASELINE))
+        with tempfile.TemporaryDirectory() as d, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()) as err:
+            code = main(["--only", "no-such-case", "--baseline", os.path.join(d, "missing.json")])
+        self.assertEqual(code, 2)
+        self.assertIn("no baseline", err.getvalue())
+
+    def test_mismatched_baselines_are_not_compared(self):
+        # Проверка: быстрый прогон не сравнивается с полной базовой линией, замеры без пары —
+        # ошибка; объём работы входит в имена замеров
+        import json
+        from benchmarks.bench_suite import cases, main, unmatched
+        self.assertIn("replications/n=8/workers=2", cases(quick=True))
+        self.assertIn("replications/n=32/workers=2", cases(quick=False))
+        baseline = {"meta": {"quick": False}, "cases": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}}}
+        current = {"cases": {"a": {"seconds": 1.0}, "c": {"seconds": 1.0}}}
+        self.assertEqual(unmatched(current, baseline), (["c"], ["b"]))
+        self.assertEqual(unmatched(current, baseline, only=["a", "c"]), (["c"], []))
+        with tempfile.TemporaryDirectory() as d, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()) as err:
+            path = os.path.join(d, "baseline.json")
+            with open(path, "w") as f:
+                json.dump(baseline, f)
+            code = main(["--quick", "--only", "no-such-case", "--baseline", path])
+        self.assertEqual(code, 2)
+        self.assertIn("not comparing", err.getvalue())
+
+
+class TestAnalytic(unittest.TestCase):
+    def setUp(self):
+        self.params = dict(params, tracing=False, SIM_TIME=20000, MAX_ORDERS=200)
+
+    def test_mva_throughput_bounds(self):
+        # Проверка: пропускная способность растёт с числом самосвалов и не превышает c / S
+        xs = [mva_throughput(n, 2, 10.0, 60.0) for n in range(1, 30)]
+        self.assertTrue(all(a < b for a, b in zip(xs, xs[1:])))
+        self.assertLessEqual(xs[-1], 2 / 10.0)
+        self.assertAlmostEqual(xs[0], 1 / 70.0)
+
+    def test_prediction_close_to_simulation(self):
+        # Проверка: оценка рейсов и загрузки близка к среднему по репликам
+        p = dict(self.params, n_trucks=4, n_loaders=2, order_interarrival_mean=100)
+        pred = predict(p)
+        sims = [summarize(r) for r in run_replications(p, n=6, master_seed=3, workers=1)]
+        for key in ("trips", "trucks_util", "loaders_util"):
+            simulated = np.mean([s[key] for s in sims])
+            self.assertLess(abs(pred[key] - simulated) / simulated, 0.25, key)
+
+    def test_prescreen_skips_pruned_points(self):
+        # Проверка: отсеянные точки не моделируются и помечаются в результате
+        points = grid({"n_trucks": [1, 2, 8]})
+        out = run_sweep(self.params, points, 2, master_seed=1, workers=1, prescreen=prescreen(keep_fraction=0.3))
+        self.assertEqual(out["pruned"], 2)
+        self.assertEqual(out["simulated"], 2)
+        kept = [r["point"]["n_trucks"] for r in out["results"] if not r.get("pruned")]
+        self.assertEqual(kept, [8])
+        with self.assertRaises(ValueError):
+            run_sweep(self.params, points, 1, master_seed=1, workers=1, prescreen=lambda s: [True])
+        with self.assertRaises(ValueError):
+            prescreen(metric="trucks_util")
+
+    def test_prediction_is_fast(self):
+        # Проверка: оценка одной конфигурации — доли миллисекунды
+        import time
+        p = dict(self.params, n_trucks=2, n_loaders=1, order_interarrival_mean=150)
+        start = time.perf_counter()
+        for _ in range(100):
+            predict(p)
+        self.assertLess((time.perf_counter() - start) / 100, 2e-3)
+
+    def test_validation_report(self):
+        # Проверка: строка на каждую точку и метрику, сводка медианных ошибок в конце
+        rows = validate(self.params, [{"n_trucks": 4}], n_replications=2, master_seed=1, metrics=["trips"])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["metric"], "trips")
+        self.assertIn("median relative error: trips=", validation_report(rows))
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.params = dict(params, tracing=False, SIM_TIME=5000, MAX_ORDERS=60)
+
+    def test_store_matches_in_memory_runs(self):
+        # Проверка: сводки, времена подготовки и ряды из хранилища совпадают с прогонами в памяти
+        runs = run_replications(self.params, n=4, master_seed=7, workers=1)
+        with tempfile.TemporaryDirectory() as d:
+            for workers in (1, 2):
+                store = run_to_columns(os.path.join(d, str(workers)), self.params, n=4, master_seed=7,
+                                       workers=workers, step=300)
+                self.assertEqual(len(store.parts), workers)
+                self.assertEqual(store.replication_numbers().tolist(), [0, 1, 2, 3])
+                self.assertEqual(store.summary_rows(), [summarize(r) for r in runs])
+                self.assertIsInstance(store.summary_rows()[0]["delivered_heaps"], int)
+                for i, run in enumerate(runs):
+                    self.assertEqual(store.prep_times(i).tolist(), run["avg_prep_time"])
+                    self.assertEqual(store.summary("avg_prep_time")[i], run["avg_prep_time_mean"])
+                    for key in store.series_keys:
+                        s = store.series(key, i)
+                        self.assertEqual(list(zip(s.times.tolist(), s.values.tolist())), list(run[key]))
+
+    def test_columns_are_memory_mapped_npy(self):
+        # Проверка: колонки — обычные .npy, читаются отображением без загрузки в память
+        with tempfile.TemporaryDirectory() as d:
+            run_to_columns(d, self.params, n=2, master_seed=1, workers=1)
+            store = ColumnStore(d)
+            self.assertIsInstance(store.summary("trips"), np.memmap)
+            self.assertIsInstance(store[1]["busy_trucks"].times, np.memmap)
+            loaded = np.load(os.path.join(d, "part-000", "busy_trucks.offsets.npy"))
+            self.assertEqual(loaded[-1], len(store.column(0, "busy_trucks.t")))
+            with self.assertRaises(ValueError):
+                run_to_columns(d, self.params, n=1, master_seed=1, workers=1)
+            with self.assertRaises(IndexError):
+                store.replication(2)
+
+    def test_prep_times_are_dropped_after_flush(self):
+        # Проверка: выгруженные времена подготовки не копятся в памяти, среднее — по всем
+        from columnar import PartWriter
+        p = dict(self.params, SIM_TIME=20000, MAX_ORDERS=300)
+        full = Simulation(p, rng=random.Random(5))
+        full.start()
+        with tempfile.TemporaryDirectory() as d:
+            writer = PartWriter(d)
+            sim = Simulation(p, rng=random.Random(5))
+            writer.begin(0)
+            longest = 0
+            for _ in sim.run_iter(500):
+                writer.flush(sim)
+                longest = max(longest, len(sim.stats["avg_prep_time"]))
+            writer.end(sim)
+            writer.close()
+            self.assertLess(longest, 50)
+            self.assertEqual(sim.stats["avg_prep_time"], [])
+            self.assertEqual(sim.stats["avg_prep_time_mean"], full.stats["avg_prep_time_mean"])
+            self.assertEqual(np.load(os.path.join(d, "prep_time.npy")).tolist(), full.stats["avg_prep_time"])
+
+    def test_main_streams_to_columns(self):
+        # Проверка: командная строка пишет хранилище, графики строятся по данным с диска
+        from main import main
+        with tempfile.TemporaryDirectory() as d:
+            root = os.path.join(d, "store")
+            args = ["-n", "2", "--set", "SIM_TIME=3000", "--set", "MAX_ORDERS=15", "--seed", "4"]
+            with contextlib.redirect_stdout(io.StringIO()):
+                code = main(args + ["--columns", root, "--plot-dir", os.path.join(d, "plots"),
+                                    "--output", os.path.join(d, "columns.json")])
+                main(args + ["--output", os.path.join(d, "memory.json")])
+            self.assertEqual(code, 0)
+            self.assertEqual(len(ColumnStore(root)), 2)
+            self.assertEqual(len(os.listdir(os.path.join(d, "plots"))), 3)
+            # --columns не меняет файл результатов (целые счётчики остаются целыми)
+            with open(os.path.join(d, "columns.json")) as a, open(os.path.join(d, "memory.json")) as b:
+                self.assertEqual(a.read(), b.read())
+
+
 class TestVisualization(unittest.TestCase):
     @patch("matplotlib.pyplot.show")
     def test_plot_series(self, mock_show):
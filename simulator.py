@@ -1,126 +1,370 @@
-import heapq
 import random
+import time as _time
 
-from event import Event
+import tracelog
+from fel import make_event_list
+from orderbook import OrderBook
+from recorder import StateRecorder, StepSeries
+from streamstats import StreamingStats, TimeWeightedStats
+from truck import LOADER_STATES, LOADING, TRAVELING, TRUCK_STATES, UNLOADING, Fleet
+
+# версия модели: меняется при любом изменении логики, влияющем на результаты
+# (ключ кэша результатов в sweep.ResultStore)
+MODEL_VERSION = "1"
+
+# состав техники на площадке по умолчанию и параметры, которыми он задаётся
+DEFAULT_RESOURCES = {"bulldozer": 1, "loaders": 2, "trucks": 4}
+RESOURCE_PARAMS = {"bulldozer": "n_bulldozers", "loaders": "n_loaders", "trucks": "n_trucks"}
+UNLOAD_TIME = 5  # фиксированное время разгрузки
+
+
+def resources_from_params(params):
+    return {r: int(params.get(key, DEFAULT_RESOURCES[r])) for r, key in RESOURCE_PARAMS.items()}
+
+
+# ряды занятости в stats -> ресурс в busy
+STATE_CHANNELS = {"busy_trucks": "trucks", "busy_loaders": "loaders", "bulldozer_busy": "bulldozer"}
 
 
 class Simulation:
-    def __init__(self, params):
+    def __init__(self, params, rng=None, variates=None, observers=None, replication=None):
         self.t = 0.0
         self.last_t = 0.0
-        self.events = []
+        # список будущих событий: "heap" (по умолчанию) или "calendar"
+        self.events = make_event_list(params.get("event_list", "heap"))
         self.params = params
+        # трассировка: None (выключена), печать текста или двоичный журнал — см. tracelog.make_tracer;
+        # replication — номер реплики (свой файл журнала у каждой), None — одиночный прогон
+        self.replication = replication
+        self.tracer = tracelog.make_tracer(params, replication)
+        # собственный генератор реплики (random.Random); по умолчанию — глобальный модуль random
+        self.rng = rng if rng is not None else random
+        # отдельные потоки по активностям (variates.VariateStreams); если заданы — вместо rng
+        self.variates = variates
+        # наблюдатели цикла событий (instrument.Observer, например instrument.Profiler);
+        # пустой список — обычный цикл без накладных расходов
+        self.observers = list(observers) if observers else []
+
+        # streaming_stats=True: память O(1) по длине прогона — время подготовки и занятость
+        # копятся в потоковых накопителях, а не в списках (ряды по умолчанию тоже выключены)
+        streaming = params.get("streaming_stats", False)
+
+        # ряды занятости хранятся только в точках изменения; record_history=False отключает их,
+        # оставляя лишь интегралы area_busy
+        self.recorder = StateRecorder(STATE_CHANNELS, history=params.get("record_history", not streaming))
 
         self.stats = {
             "delivered_heaps": 0,
             "orders_completed": 0,
             "trips": 0,
-            # time series sampled at event times: list of (time, value)
-            "busy_trucks": [],
-            "busy_loaders": [],
-            "bulldozer_busy": [],
             "avg_prep_time": [],
         }
+        # time series: StepSeries из (time, value), только изменения
+        for key in STATE_CHANNELS:
+            series = self.recorder.series.get(key)
+            self.stats[key] = series if series is not None else StepSeries(1)
 
-        self.resources = {"bulldozer": 1, "loaders": 2, "trucks": 4}
+        self.resources = resources_from_params(params)
         self.busy = {"bulldozer": 0, "loaders": 0, "trucks": 0}
         self.area_busy = {r: 0.0 for r in self.resources}  # интеграл занятости по времени (unit-seconds)
+        self.occupancy = None
+        self.prep_stats = None
+        if streaming:
+            self._new_accumulators()
+        self.n_orders = 0
+        # номер, с которого считается бюджет MAX_ORDERS (после прогрева — заказы,
+        # находившиеся в системе на момент сброса, плюс новые)
+        self.order_base = 0
+        self.stats_start = 0.0  # начало сбора статистики (после прогрева — момент сброса)
         self.heaps = 0
         self.orders = []
-        self.active_orders = {}
+        # незавершённые заказы с индексом для диспетчеризации: "fifo", "shortest_remaining",
+        # "earliest_deadline"
+        self.order_book = OrderBook(params.get("dispatch_policy", "fifo"))
         self.stop_flag = False
+        # остановка после стольких завершённых заказов (run_iter может задать меньше)
+        self.order_limit = params["MAX_ORDERS"]
+        # момент паузы run_iter: часы стоят на последнем событии, следующий run_iter
+        # продолжает сетку окон с этого момента
+        self._iter_t = 0.0
+        # finish() уже вызван: итоги посчитаны, журнал закрыт — повторный finish и run_iter
+        # ничего не делают
+        self.finished = False
+        # entity_tracking=True: каждый самосвал и погрузчик учитывается поштучно (truck.Fleet),
+        # номера единиц передаются обработчикам дополнительными аргументами
+        self.trucks = None
+        self.loaders = None
+        if params.get("entity_tracking", False):
+            self.trucks = Fleet(self.resources["trucks"], TRUCK_STATES)
+            self.loaders = Fleet(self.resources["loaders"], LOADER_STATES)
+
+    @property
+    def active_orders(self):
+        return self.order_book
+
+    @active_orders.setter
+    def active_orders(self, orders):
+        # новая политика из той же фабрики: прежние заказы в неё не попадают
+        self.order_book = OrderBook(self.order_book.factory, orders)
 
     def schedule(self, delay, event_type, func, *args):
-        heapq.heappush(self.events, Event(self.t + delay, event_type, func, *args))
-
-    def trace(self, msg):
-        if self.params.get("tracing"):
-            print(f"[{self.t:.1f}] {msg}")
-
-    def trace_state(self):
-        if self.params.get("tracing"):
-            self.trace(
-                f"Состояние: занятых самосвалов={self.busy['trucks']}, "
-                f"погрузчиков={self.busy['loaders']}, "
-                f"бульдозер={self.busy['bulldozer']}"
-            )
+        self.events.push(self.t + delay, event_type, func, args)
+
+    def trace(self, kind, order_id=-1, value=0.0):
+        # запись трассы: тип события + числа, текст собирается только при чтении журнала.
+        # в обработчиках вызов стоит под проверкой self.tracer, чтобы без трассировки
+        # не тратить даже вызов функции
+        if self.tracer is not None:
+            self.tracer.emit(self.t, kind, order_id, value, self.busy)
 
-    def sample(self, mean):
-        return random.expovariate(1.0 / mean)
+    def sample(self, mean, activity=None):
+        if self.variates is not None and activity is not None:
+            return mean * self.variates.streams[activity]()
+        return self.rng.expovariate(1.0 / mean)
+
+    def order_size(self):
+        if self.variates is not None:
+            return self.variates.randint("order_size", 3, 7)
+        return self.rng.randint(3, 7)
 
     def record_state(self):
-        # сохраняем снимок состояния в момент времени self.t
-        self.stats["busy_trucks"].append((self.t, self.busy["trucks"]))
-        self.stats["busy_loaders"].append((self.t, self.busy["loaders"]))
-        self.stats["bulldozer_busy"].append((self.t, self.busy["bulldozer"]))
+        # сохраняем снимок состояния в момент времени self.t (повторы значений отбрасываются)
+        self.recorder.record(self.t, self.busy)
 
     # -------------------- ПРОЦЕССЫ --------------------
 
-    def start(self):
+    def start(self, observers=None):
+        if observers:
+            self.observers.extend(observers)
+        self.initialize()
+        self.run()
+        self.finish()
+
+    def run_iter(self, step, until=None, stop_orders=None):
+        # пошаговый прогон: каждые step единиц модельного времени отдаёт сводку окна
+        # (state_record). Следующее окно считается только когда потребитель попросит,
+        # поэтому генератор сам даёт обратное давление и паузу. until — пауза в этот момент
+        # (генератор заканчивается, прогон можно продолжить новым run_iter); stop_orders —
+        # остановка после стольких завершённых заказов. Дойдя до конца (SIM_TIME или
+        # остановки), вызывает finish(): stats в точности те же, что после start() —
+        # часы между окнами не переводятся, интегралы занятости не дробятся
+        if step <= 0:
+            raise ValueError(f"step must be positive, got {step!r}")
+        if self.finished:
+            return
+        if self.events.scheduled == 0:
+            self.initialize()
+        limit = self.params["MAX_ORDERS"]
+        self.order_limit = limit if stop_orders is None else min(stop_orders, limit)
+        sim_time = self.params["SIM_TIME"]
+        end = sim_time if until is None else min(until, sim_time)
+        now = max(self.t, self._iter_t)
+        while now < end and self.events and not self.stop_flag:
+            prev = self._window_start(now)
+            now += step
+            if now < end or end < sim_time:
+                now = min(now, end)
+                self.run(until=now, advance=False)
+            else:
+                # последнее окно — обычным run(): как и start(), он обрабатывает событие,
+                # начавшееся до SIM_TIME, даже если его время позже
+                self.run()
+                now = self.t
+            self._iter_t = now
+            yield self.state_record(prev, now)
+        if self.stop_flag or self.t >= sim_time or not self.events:
+            if self.t < sim_time:
+                prev = self._window_start(now)
+                self.run()
+                yield self.state_record(prev, self.t)
+            self.finish()
+
+    def _area_at(self, t):
+        # интегралы занятости на момент t >= self.t (до следующего события busy не меняется)
+        dt = t - self.t
+        return {r: self.area_busy[r] + self.busy[r] * dt for r in self.area_busy}
+
+    def _window_start(self, t):
+        return t, self._area_at(t), self.stats["trips"], self.stats["orders_completed"]
+
+    def state_record(self, prev=None, t=None):
+        # компактная сводка: состояние в момент t и средние за окно [t0, t]
+        t = self.t if t is None else t
+        record = {
+            "t": t,
+            "busy": dict(self.busy),
+            "heaps": self.heaps,
+            "pending_orders": len(self.order_book),
+            "orders_completed": self.stats["orders_completed"],
+            "trips": self.stats["trips"],
+            "events": self.events.scheduled,
+            "stopped": self.stop_flag,
+        }
+        if prev is not None:
+            t0, area0, trips, completed = prev
+            area = self._area_at(t)
+            dt = t - t0
+            record["t0"] = t0
+            record["mean_busy"] = {r: (area[r] - area0[r]) / dt if dt > 0 else self.busy[r] for r in area}
+            record["window_trips"] = self.stats["trips"] - trips
+            record["window_orders_completed"] = self.stats["orders_completed"] - completed
+        return record
+
+    def initialize(self):
         self.schedule(0, "order_arrival", self.order_arrival)
-        self.schedule(0, "heap_formation", self.form_heap)
+        # у каждого бульдозера своя цепочка формирования куч
+        for _ in range(self.resources["bulldozer"]):
+            self.schedule(0, "heap_formation", self.form_heap)
         self.record_state()
         self.last_t = self.t
 
-        while self.events and self.t < self.params["SIM_TIME"] and not self.stop_flag:
-            ev = heapq.heappop(self.events)
-            # интегрируем занятость за интервал [self.t, ev.time)
-            dt = max(0.0, ev.time - self.t)
+    def run(self, until=None, advance=True):
+        # until=None — до конца моделирования (SIM_TIME или остановки); иначе обрабатываются
+        # события не позже until, и часы переводятся ровно на until (для прогрева и снимков);
+        # advance=False оставляет часы на последнем событии
+        if self.observers:
+            return self._run_observed(until, advance)
+        events = self.events
+        while events and self.t < self.params["SIM_TIME"] and not self.stop_flag:
+            if until is not None and events.peek_time() > until:
+                break
+            time, _, _, func, args = events.pop()
+            # интегрируем занятость за интервал [self.t, time)
+            dt = max(0.0, time - self.t)
             if dt > 0:
-                for r in self.busy:
-                    # area_busy хранит суммарное число занятых единиц * время
-                    self.area_busy[r] += self.busy[r] * dt
+                self._integrate(dt)
             # продвигаем время
-            self.t = ev.time
-            ev.func(*ev.args)
+            self.t = time
+            func(*args)
             self.record_state()
             self.last_t = self.t
 
+        if advance:
+            self._advance_to_end(until)
+
+    def _run_observed(self, until, advance=True):
+        # тот же цикл, что в run, с замером фаз каждого события и вызовом наблюдателей
+        events = self.events
+        observers = self.observers
+        clock = _time.perf_counter
+        for obs in observers:
+            obs.on_run_start(self)
+        while events and self.t < self.params["SIM_TIME"] and not self.stop_flag:
+            if until is not None and events.peek_time() > until:
+                break
+            t0 = clock()
+            time, _, event_type, func, args = events.pop()
+            t1 = clock()
+            dt = max(0.0, time - self.t)
+            if dt > 0:
+                self._integrate(dt)
+            self.t = time
+            for obs in observers:
+                obs.before_event(self, time, event_type)
+            t2 = clock()
+            func(*args)
+            t3 = clock()
+            self.record_state()
+            t4 = clock()
+            self.last_t = self.t
+            for obs in observers:
+                obs.after_event(self, event_type, t1 - t0, t3 - t2, t4 - t3)
+        if advance:
+            self._advance_to_end(until)
+        for obs in observers:
+            obs.on_run_end(self)
+
+    def _advance_to_end(self, until):
         # учесть остаток времени до конца моделирования (если нужно)
-        if self.t < self.params["SIM_TIME"]:
-            dt = self.params["SIM_TIME"] - self.t
-            for r in self.busy:
-                self.area_busy[r] += self.busy[r] * dt
-            self.t = self.params["SIM_TIME"]
+        end = self.params["SIM_TIME"] if until is None else min(until, self.params["SIM_TIME"])
+        if self.t < end:
+            self._integrate(end - self.t)
+            self.t = end
             self.record_state()
 
-        self.finish()
+    def _integrate(self, dt):
+        for r in self.busy:
+            # area_busy хранит суммарное число занятых единиц * время
+            self.area_busy[r] += self.busy[r] * dt
+        if self.occupancy is not None:
+            for r, acc in self.occupancy.items():
+                acc.add(self.busy[r], dt)
+
+    def reset_statistics(self):
+        # конец прогрева: состояние системы остаётся, статистика начинается заново с self.t
+        self.stats_start = self.t
+        for key in ("delivered_heaps", "orders_completed", "trips"):
+            self.stats[key] = 0
+        # бюджет заказов тоже отсчитывается заново: незавершённые заказы прогрева входят
+        # в него, как в холодном прогоне, и остановка по MAX_ORDERS остаётся достижимой
+        exhausted = self.n_orders - self.order_base >= self.params["MAX_ORDERS"]
+        self.order_base = self.n_orders - len(self.order_book)
+        if exhausted and self.n_orders - self.order_base < self.params["MAX_ORDERS"]:
+            # поток заказов уже остановился в прогреве — возобновить
+            self.schedule(
+                self.sample(self.params["order_interarrival_mean"], "interarrival"),
+                "order_arrival",
+                self.order_arrival,
+            )
+        self.stats["avg_prep_time"] = []
+        self.area_busy = {r: 0.0 for r in self.resources}
+        for series in self.recorder.series.values():
+            series.clear()
+        self.record_state()
+        if self.occupancy is not None:
+            self._new_accumulators()
+        if self.trucks is not None:
+            self.trucks.reset_statistics(self.t)
+            self.loaders.reset_statistics(self.t)
+
+    def _new_accumulators(self):
+        self.occupancy = {r: TimeWeightedStats() for r in self.resources}
+        self.prep_stats = StreamingStats(hist=self.params.get("prep_time_hist", (0.0, 2000.0, 40)))
 
     def order_arrival(self):
-        if len(self.orders) >= self.params["MAX_ORDERS"]:
-            self.trace("Достигнут лимит заказов, новые не создаются")
+        if self.n_orders - self.order_base >= self.params["MAX_ORDERS"]:
+            if self.tracer is not None:
+                self.trace(tracelog.ORDER_LIMIT)
             return
 
-        order_id = len(self.orders)
-        n_heaps = random.randint(3, 7)
-        self.orders.append(n_heaps)
-        self.active_orders[order_id] = {"required": n_heaps, "done": 0, "start": self.t}
-        self.trace(f"Новый заказ {order_id}: {n_heaps} куч")
+        order_id = self.n_orders
+        n_heaps = self.order_size()
+        self.n_orders += 1
+        if self.prep_stats is None:
+            self.orders.append(n_heaps)
+        order = {"required": n_heaps, "done": 0, "start": self.t}
+        if "order_due_time" in self.params:
+            order["deadline"] = self.t + self.params["order_due_time"]
+        self.order_book.add(order_id, order)
+        if self.tracer is not None:
+            self.trace(tracelog.NEW_ORDER, order_id, n_heaps)
         self.try_loading()
 
-        if len(self.orders) < self.params["MAX_ORDERS"]:
+        if self.n_orders - self.order_base < self.params["MAX_ORDERS"]:
             self.schedule(
-                self.sample(self.params["order_interarrival_mean"]),
+                self.sample(self.params["order_interarrival_mean"], "interarrival"),
                 "order_arrival",
                 self.order_arrival,
             )
 
     def form_heap(self):
         if self.busy["bulldozer"] < self.resources["bulldozer"]:
-            self.busy["bulldozer"] = 1
-            delay = self.sample(self.params["heap_formation_mean"])
+            self.busy["bulldozer"] += 1
+            delay = self.sample(self.params["heap_formation_mean"], "heap_formation")
             self.schedule(delay, "heap_ready", self.heap_ready)
-            self.trace("Бульдозер формирует кучу")
-            self.trace_state()
+            if self.tracer is not None:
+                self.trace(tracelog.HEAP_START)
             # записать состояние сразу после изменения
             self.record_state()
         else:
-            self.trace("Бульдозер занят")
+            if self.tracer is not None:
+                self.trace(tracelog.BULLDOZER_BUSY)
 
     def heap_ready(self):
-        self.busy["bulldozer"] = 0
+        self.busy["bulldozer"] -= 1
         self.heaps += 1
-        self.trace(f"Новая куча готова, всего куч: {self.heaps}")
+        if self.tracer is not None:
+            self.trace(tracelog.HEAP_READY, value=self.heaps)
         # записать состояние сразу после изменения
         self.record_state()
         self.try_loading()
@@ -132,81 +376,119 @@ class Simulation:
             self.busy["loaders"] < self.resources["loaders"]
             and self.busy["trucks"] < self.resources["trucks"]
             and self.heaps >= 2
-            and any(o["done"] < o["required"] for o in self.active_orders.values())
+            and self.order_book.has_pending()
         ):
             self.start_loading()
 
     def start_loading(self):
-        order_id = next(k for k, o in self.active_orders.items() if o["done"] < o["required"])
+        order_id = self.order_book.next_pending()
         self.busy["loaders"] += 1
         self.busy["trucks"] += 1
         self.heaps -= 2
         delay = (
-            self.sample(self.params["loading_time_mean"])
+            self.sample(self.params["loading_time_mean"], "loading")
             if self.params["stochastic_loading"]
             else self.params["loading_time_mean"]
         )
-        self.schedule(delay, "loading_done", self.loading_done, order_id)
-        self.trace(f"Начата загрузка для заказа {order_id}")
-        self.trace_state()
+        if self.trucks is None:
+            self.schedule(delay, "loading_done", self.loading_done, order_id)
+        else:
+            truck = self.trucks.acquire(self.t, LOADING, order_id)
+            loader = self.loaders.acquire(self.t, LOADING, order_id)
+            self.schedule(delay, "loading_done", self.loading_done, order_id, truck, loader)
+        if self.tracer is not None:
+            self.trace(tracelog.LOADING_START, order_id)
         self.record_state()
 
-    def loading_done(self, order_id):
+    def loading_done(self, order_id, truck=-1, loader=-1):
         self.busy["loaders"] -= 1
         # изменили состояние — записать
         self.record_state()
-        travel_time = self.sample(self.params["travel_time_mean"]) if self.params["stochastic_travel"] else self.params["travel_time_mean"]
-        self.trace(f"Самосвал {order_id}-го заказа выехал к месту разгрузки, время в пути {travel_time:.1f}")
-        self.schedule(travel_time, "truck_arrive", self.truck_arrive, order_id)
+        travel_time = self.sample(self.params["travel_time_mean"], "travel") if self.params["stochastic_travel"] else self.params["travel_time_mean"]
+        if self.tracer is not None:
+            self.trace(tracelog.TRUCK_DEPART, order_id, travel_time)
+        if truck < 0:
+            self.schedule(travel_time, "truck_arrive", self.truck_arrive, order_id)
+            return
+        self.loaders.release(loader, self.t)
+        self.trucks.set_state(truck, TRAVELING, self.t)
+        self.schedule(travel_time, "truck_arrive", self.truck_arrive, order_id, truck)
 
-    def truck_arrive(self, order_id):
-        self.trace(f"Самосвал {order_id}-го заказа прибыл к месту разгрузки")
+    def truck_arrive(self, order_id, truck=-1):
+        if self.tracer is not None:
+            self.trace(tracelog.TRUCK_ARRIVE, order_id)
         self.stats["delivered_heaps"] += 2
-        unload_time = 5  # фиксированное или случайное время разгрузки
-        self.trace(f"Самосвал {order_id}-го заказа разгружается, время разгрузки {unload_time}")
-        self.schedule(unload_time, "truck_return", self.truck_return, order_id)
+        unload_time = UNLOAD_TIME  # фиксированное или случайное время разгрузки
+        if self.tracer is not None:
+            self.trace(tracelog.TRUCK_UNLOAD, order_id, unload_time)
+        if truck < 0:
+            self.schedule(unload_time, "truck_return", self.truck_return, order_id)
+            return
+        self.trucks.set_state(truck, UNLOADING, self.t)
+        self.schedule(unload_time, "truck_return", self.truck_return, order_id, truck)
 
-    def truck_return(self, order_id):
+    def truck_return(self, order_id, truck=-1):
         self.busy["trucks"] -= 1
-        self.trace(f"Самосвал {order_id}-го заказа вернулся и освобождён")
+        if truck >= 0:
+            self.trucks.release(truck, self.t)
+        if self.tracer is not None:
+            self.trace(tracelog.TRUCK_RETURN, order_id)
         self.stats["delivered_heaps"] += 2
         self.stats["trips"] += 1
         # записать состояние после изменения
         self.record_state()
 
-        if order_id not in self.active_orders:
+        if order_id not in self.order_book:
             self.try_loading()
             return
 
-        order = self.active_orders[order_id]
-        order["done"] += 2
+        order = self.order_book.progress(order_id, 2)
 
         if order["done"] >= order["required"]:
             self.stats["orders_completed"] += 1
             prep_time = self.t - order["start"]
-            self.stats["avg_prep_time"].append(prep_time)
-            self.trace(f"Заказ {order_id} завершён, время подготовки {prep_time:.1f}")
-            del self.active_orders[order_id]
+            if self.prep_stats is None:
+                self.stats["avg_prep_time"].append(prep_time)
+            else:
+                self.prep_stats.push(prep_time)
+            if self.tracer is not None:
+                self.trace(tracelog.ORDER_DONE, order_id, prep_time)
+            del self.order_book[order_id]
 
             # если достигнуто нужное число завершённых заказов — остановка моделирования
-            if self.stats["orders_completed"] >= self.params["MAX_ORDERS"]:
-                self.trace("Достигнуто максимальное число выполненных заказов. Симуляция завершается.")
+            if self.stats["orders_completed"] >= self.order_limit:
+                if self.tracer is not None:
+                    self.trace(tracelog.STOP)
                 self.stop_flag = True
                 return
 
         self.try_loading()
 
     def finish(self):
+        if self.finished:
+            return
+        self.finished = True
         # среднее время подготовки
-        if self.stats["avg_prep_time"]:
+        if self.prep_stats is not None:
+            self.stats["avg_prep_time_mean"] = self.prep_stats.mean
+            self.stats["prep_time"] = self.prep_stats.as_dict()
+            self.stats["occupancy"] = {
+                r: {"mean": acc.mean, "var": acc.variance} for r, acc in self.occupancy.items()
+            }
+        elif self.stats["avg_prep_time"]:
             self.stats["avg_prep_time_mean"] = sum(self.stats["avg_prep_time"]) / len(self.stats["avg_prep_time"])
         else:
             self.stats["avg_prep_time_mean"] = float("nan")
 
         # средняя загрузка по времени (fraction of total capacity)
         utilization = {}
-        sim_time = float(self.params["SIM_TIME"])
+        sim_time = float(self.params["SIM_TIME"]) - self.stats_start
         for r in self.resources:
             # превращаем unit-seconds в долю от (resources[r] * SIM_TIME)
             utilization[r] = self.area_busy[r] / (self.resources[r] * sim_time)
-        self.stats["utilization"] = utilization
\ No newline at end of file
+        self.stats["utilization"] = utilization
+        if self.trucks is not None:
+            self.stats["fleet"] = {"trucks": self.trucks.summary(self.t), "loaders": self.loaders.summary(self.t)}
+
+        if self.tracer is not None:
+            self.tracer.close()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import copy
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from orderbook import OrderBook
+from replication import replication_rng, replication_variates, resolve_master_seed, resolve_workers
+from simulator import STATE_CHANNELS, Simulation
+
+# ------------------------ СНИМОК СОСТОЯНИЯ ------------------------
+# Снимок — обычный словарь без ссылок на объект Simulation: события списка будущих
+# событий хранятся с именем обработчика вместо связанного метода, генератор — своим
+# состоянием. Снимок можно сохранить на диск, передать в другой процесс и восстановить.
+SNAPSHOT_VERSION = 1
+
+
+def take_snapshot(sim):
+    # снимок берётся между событиями (после run(until=...)), не из обработчика
+    return {
+        "version": SNAPSHOT_VERSION,
+        "params": dict(sim.params),
+        "t": sim.t,
+        "last_t": sim.last_t,
+        "stats_start": sim.stats_start,
+        "stop_flag": sim.stop_flag,
+        "finished": sim.finished,
+        "events": {
+            "kind": sim.events.name,
+            "now": sim.events.now,
+            "next_seq": sim.events.scheduled,
+            "entries": [
+                (time, seq, event_type, func.__name__, args)
+                for time, seq, event_type, func, args in sim.events.entries()
+            ],
+        },
+        "busy": dict(sim.busy),
+        "heaps": sim.heaps,
+        "n_orders": sim.n_orders,
+        "order_base": sim.order_base,
+        "orders": list(sim.orders),
+        # имя, класс или фабрика политики (как в params): политика строится заново при восстановлении
+        "dispatch_policy": sim.order_book.factory,
+        "active_orders": [(k, dict(o)) for k, o in sim.order_book.items()],
+        "area_busy": dict(sim.area_busy),
+        "stats": {
+            k: (list(v) if k in STATE_CHANNELS or isinstance(v, list) else copy.deepcopy(v))
+            for k, v in sim.stats.items()
+        },
+        "occupancy": copy.deepcopy(sim.occupancy),
+        "prep_stats": copy.deepcopy(sim.prep_stats),
+        "rng_state": sim.rng.getstate(),
+        "variates": copy.deepcopy(sim.variates),
+        "fleets": copy.deepcopy((sim.trucks, sim.loaders)),
+    }
+
+
+def restore(snapshot, rng=None, variates=None, params=None, replication=None):
+    # rng/variates: новые генераторы для ветвления реплик; по умолчанию — из снимка
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version: {snapshot.get('version')!r}")
+    params = dict(snapshot["params"] if params is None else params)
+    if rng is None:
+        rng = random.Random()
+        rng.setstate(snapshot["rng_state"])
+    if variates is None:
+        variates = copy.deepcopy(snapshot["variates"])
+
+    sim = Simulation(params, rng=rng, variates=variates, replication=replication)
+    sim.t = snapshot["t"]
+    sim.last_t = snapshot["last_t"]
+    sim.stats_start = snapshot["stats_start"]
+    sim.stop_flag = snapshot["stop_flag"]
+    sim.finished = snapshot.get("finished", False)
+    sim.busy = dict(snapshot["busy"])
+    sim.heaps = snapshot["heaps"]
+    sim.n_orders = snapshot["n_orders"]
+    sim.order_base = snapshot.get("order_base", 0)
+    sim.orders = list(snapshot["orders"])
+    sim.order_book = OrderBook(snapshot["dispatch_policy"], {k: dict(o) for k, o in snapshot["active_orders"]})
+    sim.area_busy = dict(snapshot["area_busy"])
+    sim.trucks, sim.loaders = copy.deepcopy(snapshot["fleets"])
+
+    for key, value in snapshot["stats"].items():
+        if key in STATE_CHANNELS:
+            series = sim.stats[key]
+            for t, v in value:
+                series.append(t, v)
+        else:
+            sim.stats[key] = copy.deepcopy(value)
+    if snapshot["occupancy"] is not None:
+        sim.occupancy = copy.deepcopy(snapshot["occupancy"])
+        sim.prep_stats = copy.deepcopy(snapshot["prep_stats"])
+
+    ev = snapshot["events"]
+    if ev["kind"] != sim.events.name:
+        raise ValueError(f"snapshot uses event list {ev['kind']!r}, params select {sim.events.name!r}")
+    sim.events.restore(
+        [(time, seq, event_type, getattr(sim, name), tuple(args)) for time, seq, event_type, name, args in ev["entries"]],
+        ev["next_seq"],
+        ev["now"],
+    )
+    return sim
+
+
+def save_snapshot(snapshot, path):
+    with open(path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_snapshot(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# ------------------------ ПРОГРЕВ И ВЕТВЛЕНИЕ ------------------------
+def warm_up(params, warmup_time, master_seed=None, index=-1):
+    # один прогон до warmup_time, затем сброс статистики и снимок «прогретой» системы
+    # отрицательный index — прогрев со своими потоками, не совпадающими ни с одной репликой
+    master_seed = resolve_master_seed(params, master_seed)
+    sim = Simulation(
+        params,
+        rng=replication_rng(master_seed, index),
+        variates=replication_variates(params, master_seed, index if index >= 0 else None),
+    )
+    sim.initialize()
+    sim.run(until=warmup_time)
+    sim.reset_statistics()
+    return take_snapshot(sim)
+
+
+def branch(snapshot, index, master_seed):
+    # реплика index продолжает снимок со своим потоком случайных чисел
+    params = snapshot["params"]
+    variates = replication_variates(params, master_seed, index)
+    return restore(snapshot, rng=replication_rng(master_seed, index), variates=variates, replication=index)
+
+
+def run_branch(snapshot, master_seed, index):
+    sim = branch(snapshot, index, master_seed)
+    sim.run()
+    sim.finish()
+    return sim.stats
+
+
+_worker_snapshot = None
+
+
+def _init_worker(payload):
+    # снимок передаётся в процесс один раз, а не с каждой задачей
+    global _worker_snapshot
+    _worker_snapshot = pickle.loads(payload)
+
+
+def _run_worker_branch(master_seed, index):
+    return run_branch(_worker_snapshot, master_seed, index)
+
+
+def run_branches(snapshot, n, master_seed=None, workers=None, start=0):
+    # n реплик от одного снимка; результаты в порядке индексов и не зависят от числа процессов
+    master_seed = resolve_master_seed(snapshot["params"], master_seed)
+    workers = min(resolve_workers(workers), max(1, n))
+    indices = range(start, start + n)
+    if workers == 1:
+        return [run_branch(snapshot, master_seed, i) for i in indices]
+    payload = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+    chunksize = max(1, n // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(payload,)) as pool:
+        return list(pool.map(_run_worker_branch, [master_seed] * n, indices, chunksize=chunksize))
+
+
+# ------------------------ ОПРЕДЕЛЕНИЕ ДЛИНЫ ПРОГРЕВА ------------------------
+def mser5(values):
+    # MSER-5 (White, 1997): среднее по пачкам из 5 наблюдений; отсечка d минимизирует
+    # дисперсию оставшейся части, делённую на квадрат её длины. Возвращает число
+    # отбрасываемых исходных наблюдений (кратно 5); ищется в первой половине ряда
+    m = len(values) // 5
+    if m < 2:
+        return 0
+    z = [sum(values[5 * i : 5 * i + 5]) / 5.0 for i in range(m)]
+    best_d, best = 0, float("inf")
+    # суммы хвостов для O(m) перебора отсечки
+    tail_sum = tail_sq = 0.0
+    stats = [None] * m
+    for i in range(m - 1, -1, -1):
+        tail_sum += z[i]
+        tail_sq += z[i] * z[i]
+        stats[i] = (tail_sum, tail_sq)
+    for d in range(m // 2 + 1):
+        k = m - d
+        s, sq = stats[d]
+        value = (sq - s * s / k) / (k * k)
+        if value < best:
+            best_d, best = d, value
+    return 5 * best_d
+
+
+def detect_warmup(series, end_time, bins=200):
+    # момент окончания прогрева по ряду занятости (StepSeries или список (t, v)):
+    # ряд усредняется по времени в bins интервалах, к ним применяется MSER-5
+    import numpy as np
+
+    from resample import as_step_arrays, time_weighted_bins
+
+    edges = np.linspace(0.0, end_time, bins + 1)
+    means = time_weighted_bins(*as_step_arrays(series), edges)
+    return float(edges[mser5(list(means))])
@@ -0,0 +1,208 @@
+import math
+from array import array
+
+# ------------------------ ПОТОКОВАЯ СТАТИСТИКА ------------------------
+Z95 = 1.96  # как в mean_ci
+
+
+class RunningStats:
+    # среднее и дисперсия по Уэлфорду за O(1) памяти; NaN пропускаются
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if x != x:  # NaN
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other):
+        # объединение двух накопителей (Chan et al.)
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def half_width(self, z=Z95):
+        if self.n <= 1:
+            return math.inf
+        return z * self.std / math.sqrt(self.n)
+
+    def ci(self, z=Z95):
+        # (среднее, нижняя, верхняя граница) — тот же вид, что у mean_ci
+        if self.n <= 1:
+            m = self.mean if self.n else math.nan
+            return m, m, m
+        h = self.half_width(z)
+        return self.mean, self.mean - h, self.mean + h
+
+
+class TimeWeightedStats:
+    # среднее и дисперсия кусочно-постоянной величины по времени (занятость ресурса):
+    # area — тот же интеграл, что Simulation.area_busy, area2 — интеграл квадрата
+    __slots__ = ("total_time", "area", "area2")
+
+    def __init__(self):
+        self.total_time = 0.0
+        self.area = 0.0
+        self.area2 = 0.0
+
+    def add(self, value, dt):
+        self.total_time += dt
+        self.area += value * dt
+        self.area2 += value * value * dt
+
+    @property
+    def mean(self):
+        return self.area / self.total_time if self.total_time > 0 else math.nan
+
+    @property
+    def variance(self):
+        if self.total_time <= 0:
+            return math.nan
+        m = self.area / self.total_time
+        return max(0.0, self.area2 / self.total_time - m * m)
+
+
+class P2Quantile:
+    # оценка квантиля алгоритмом P² (Jain, Chlamtac 1985): пять маркеров, O(1) памяти
+    __slots__ = ("p", "q", "n", "want", "dn", "_first")
+
+    def __init__(self, p):
+        self.p = p
+        self.q = None
+        self._first = []
+
+    def push(self, x):
+        if x != x:
+            return
+        if self.q is None:
+            self._first.append(x)
+            if len(self._first) == 5:
+                p = self.p
+                self.q = sorted(self._first)
+                self.n = [0, 1, 2, 3, 4]
+                self.want = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+                self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+            return
+
+        q, n = self.q, self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.want[i] += self.dn[i]
+
+        for i in (1, 2, 3):
+            d = self.want[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # параболическая поправка маркера, при выходе за соседей — линейная
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    @property
+    def value(self):
+        if self.q is not None:
+            return self.q[2]
+        if not self._first:
+            return math.nan
+        # меньше пяти наблюдений — квантиль по ним напрямую
+        first = sorted(self._first)
+        return first[min(len(first) - 1, int(self.p * len(first)))]
+
+
+class Histogram:
+    # фиксированные корзины на [lo, hi) + счётчики выхода за нижнюю и верхнюю границу
+    __slots__ = ("lo", "hi", "bins", "width", "counts", "underflow", "overflow")
+
+    def __init__(self, lo, hi, bins):
+        self.lo, self.hi, self.bins = lo, hi, bins
+        self.width = (hi - lo) / bins
+        self.counts = array("q", bytes(8 * bins))
+        self.underflow = 0
+        self.overflow = 0
+
+    def push(self, x):
+        if x < self.lo:
+            self.underflow += 1
+        elif x >= self.hi:
+            self.overflow += 1
+        else:
+            self.counts[min(self.bins - 1, int((x - self.lo) / self.width))] += 1
+
+    @property
+    def edges(self):
+        return [self.lo + i * self.width for i in range(self.bins + 1)]
+
+    def as_dict(self):
+        return {
+            "edges": self.edges,
+            "counts": list(self.counts),
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+        }
+
+
+class StreamingStats:
+    # среднее/дисперсия, квантили P² и гистограмма одной величины за O(1) памяти
+    def __init__(self, quantiles=(0.5, 0.95, 0.99), hist=None):
+        self.moments = RunningStats()
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+        self.histogram = Histogram(*hist) if hist else None
+
+    def push(self, x):
+        self.moments.push(x)
+        for est in self.quantiles.values():
+            est.push(x)
+        if self.histogram is not None:
+            self.histogram.push(x)
+
+    @property
+    def n(self):
+        return self.moments.n
+
+    @property
+    def mean(self):
+        return self.moments.mean if self.moments.n else math.nan
+
+    def as_dict(self):
+        out = {"n": self.moments.n, "mean": self.mean, "var": self.moments.variance}
+        for p, est in self.quantiles.items():
+            out[f"p{round(p * 100):d}"] = est.value
+        if self.histogram is not None:
+            out["histogram"] = self.histogram.as_dict()
+        return out
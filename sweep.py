@@ -0,0 +1,144 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+
+from replication import SUMMARY_METRICS, resolve_master_seed, run_summaries
+from simulator import MODEL_VERSION
+from streamstats import RunningStats
+
+# ------------------------ ПЛАН ЭКСПЕРИМЕНТА ------------------------
+# параметры, не влияющие на результат реплики: не входят в ключ кэша
+NON_MODEL_PARAMS = {
+    "tracing",
+    "trace_file",
+    "trace_buffer",
+    "trace_capacity",
+    "N_REPLICATIONS",
+    "workers",
+    "seed",
+    "record_history",
+    "event_list",
+    "entity_tracking",
+}
+
+
+def grid(space):
+    # {"n_trucks": [2, 4, 6], "loading_time_mean": [8, 10]} -> все сочетания
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def latin_hypercube(space, n, seed=0):
+    # space: {имя: (lo, hi)} — непрерывный диапазон; если обе границы int — целые
+    #        из [lo, hi] включительно (hi - lo + 1 значений делятся на n слоёв)
+    #        {имя: [v1, v2, ...]} — категории
+    # каждый параметр делится на n равных слоёв, в каждый слой попадает ровно одна точка
+    rng = random.Random(seed)
+    columns = {}
+    for name, spec in space.items():
+        strata = list(range(n))
+        rng.shuffle(strata)
+        if isinstance(spec, list):
+            columns[name] = [spec[s * len(spec) // n] for s in strata]
+            continue
+        lo, hi = spec
+        if isinstance(lo, int) and isinstance(hi, int):
+            columns[name] = [lo + int((s + rng.random()) / n * (hi - lo + 1)) for s in strata]
+            continue
+        columns[name] = [lo + (s + rng.random()) / n * (hi - lo) for s in strata]
+    return [{name: columns[name][i] for name in space} for i in range(n)]
+
+
+# ------------------------ ХРАНИЛИЩЕ РЕЗУЛЬТАТОВ ------------------------
+def model_params(params):
+    return {k: v for k, v in params.items() if k not in NON_MODEL_PARAMS}
+
+
+def result_key(params, master_seed, index):
+    payload = json.dumps(
+        {"model": MODEL_VERSION, "params": model_params(params), "seed": master_seed, "replication": index},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultStore:
+    # сводки реплик на диске: root/ab/abcdef....json, имя файла — хеш
+    # (версия модели, параметры, главное зерно, номер реплики)
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, summary):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(summary, f)
+        os.replace(tmp, path)
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+
+# ------------------------ ПРОГОН ------------------------
+def run_sweep(base_params, points, n_replications=None, master_seed=None, store=None, workers=None, prescreen=None):
+    # для каждой точки — n_replications реплик; уже посчитанные берутся из store,
+    # моделируются только недостающие. prescreen(scenarios) -> список bool: точки с False
+    # не моделируются (например, analytic.prescreen — отбор по приближённой оценке)
+    n = base_params["N_REPLICATIONS"] if n_replications is None else n_replications
+    master_seed = resolve_master_seed(base_params, master_seed)
+    scenarios = [{**base_params, **point} for point in points]
+    kept = [True] * len(scenarios) if prescreen is None else [bool(k) for k in prescreen(scenarios)]
+    if len(kept) != len(scenarios):
+        raise ValueError("prescreen must return one flag per point")
+
+    summaries = [[None] * n if keep else [] for keep in kept]
+    missing = []
+    for si, params in enumerate(scenarios):
+        if not kept[si]:
+            continue
+        for i in range(n):
+            key = result_key(params, master_seed, i)
+            cached = store.get(key) if store is not None else None
+            if cached is None:
+                missing.append((si, i, key))
+            else:
+                summaries[si][i] = cached
+
+    computed = run_summaries(((scenarios[si], master_seed, i) for si, i, _ in missing), workers)
+    for (si, i, key), summary in zip(missing, computed):
+        summaries[si][i] = summary
+        if store is not None:
+            store.put(key, summary)
+
+    results = []
+    for point, rows, keep in zip(points, summaries, kept):
+        if not keep:
+            results.append({"point": point, "pruned": True, "summaries": [], "metrics": {}})
+            continue
+        acc = {m: RunningStats() for m in SUMMARY_METRICS}
+        for row in rows:
+            for m in SUMMARY_METRICS:
+                acc[m].push(row[m])
+        results.append({"point": point, "summaries": rows, "metrics": {m: acc[m].ci() for m in SUMMARY_METRICS}})
+    pruned = kept.count(False)
+    return {
+        "results": results,
+        "simulated": len(missing),
+        "cached": (len(scenarios) - pruned) * n - len(missing),
+        "pruned": pruned,
+    }
@@ -0,0 +1,184 @@
+import mmap
+import os
+import struct
+import sys
+
+# ------------------------ ТИПЫ ЗАПИСЕЙ ТРАССЫ ------------------------
+# Трасса хранит не строки, а записи фиксированного размера:
+# (время, тип, номер заказа, значение, занятые самосвалы, погрузчики, бульдозер).
+# Текст собирается только при чтении (render) — в прогоне строки не форматируются.
+ORDER_LIMIT = 1
+NEW_ORDER = 2
+HEAP_START = 3
+BULLDOZER_BUSY = 4
+HEAP_READY = 5
+LOADING_START = 6
+TRUCK_DEPART = 7
+TRUCK_ARRIVE = 8
+TRUCK_UNLOAD = 9
+TRUCK_RETURN = 10
+ORDER_DONE = 11
+STOP = 12
+
+MESSAGES = {
+    ORDER_LIMIT: "Достигнут лимит заказов, новые не создаются",
+    NEW_ORDER: "Новый заказ {order}: {value:.0f} куч",
+    HEAP_START: "Бульдозер формирует кучу",
+    BULLDOZER_BUSY: "Бульдозер занят",
+    HEAP_READY: "Новая куча готова, всего куч: {value:.0f}",
+    LOADING_START: "Начата загрузка для заказа {order}",
+    TRUCK_DEPART: "Самосвал {order}-го заказа выехал к месту разгрузки, время в пути {value:.1f}",
+    TRUCK_ARRIVE: "Самосвал {order}-го заказа прибыл к месту разгрузки",
+    TRUCK_UNLOAD: "Самосвал {order}-го заказа разгружается, время разгрузки {value:g}",
+    TRUCK_RETURN: "Самосвал {order}-го заказа вернулся и освобождён",
+    ORDER_DONE: "Заказ {order} завершён, время подготовки {value:.1f}",
+    STOP: "Достигнуто максимальное число выполненных заказов. Симуляция завершается.",
+}
+# после этих событий в журнал выводится строка состояния ресурсов
+WITH_STATE = {HEAP_START, LOADING_START}
+STATE_MESSAGE = "Состояние: занятых самосвалов={trucks}, погрузчиков={loaders}, бульдозер={bulldozer}"
+
+RECORD = struct.Struct("<dBidHHB")
+# заголовок: сигнатура, ёмкость (записей), всего записано
+HEADER = struct.Struct("<8sQQ")
+MAGIC = b"SIMTRC1\0"
+
+
+# ------------------------ ЗАПИСЬ ------------------------
+class TraceLog:
+    # кольцевой буфер записей: в памяти (bytearray) или в отображённом файле (mmap);
+    # при переполнении затираются самые старые записи
+    def __init__(self, capacity=65536, path=None, sync_every=1024):
+        self.capacity = capacity
+        self.count = 0
+        self.path = path
+        self.closed = False
+        self._sync_every = sync_every
+        size = HEADER.size + capacity * RECORD.size
+        if path is None:
+            self._file = None
+            self.buffer = bytearray(size)
+        else:
+            self._file = open(path, "w+b")
+            self._file.truncate(size)
+            self.buffer = mmap.mmap(self._file.fileno(), size)
+        self._sync()
+
+    def emit(self, t, kind, order, value, busy):
+        n = self.count
+        RECORD.pack_into(
+            self.buffer,
+            HEADER.size + (n % self.capacity) * RECORD.size,
+            t,
+            kind,
+            order,
+            value,
+            busy["trucks"],
+            busy["loaders"],
+            busy["bulldozer"],
+        )
+        self.count = n + 1
+        if self._file is not None and self.count % self._sync_every == 0:
+            self._sync()
+
+    def _sync(self):
+        HEADER.pack_into(self.buffer, 0, MAGIC, self.capacity, self.count)
+
+    def records(self):
+        self._sync()
+        return list(iter_records(self.buffer))
+
+    def save(self, path):
+        self._sync()
+        with open(path, "wb") as f:
+            f.write(self.buffer)
+
+    def close(self):
+        # повторный close (например, finish после finish) ничего не делает:
+        # отображение уже закрыто, писать заголовок некуда
+        if self.closed:
+            return
+        self.closed = True
+        self._sync()
+        if self._file is not None:
+            self.buffer.flush()
+            self.buffer.close()
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+
+class TextTrace:
+    # прежнее поведение tracing=True: сразу печатать читаемый журнал
+    def __init__(self, out=None):
+        self.out = out
+
+    def emit(self, t, kind, order, value, busy):
+        record = (t, kind, order, value, busy["trucks"], busy["loaders"], busy["bulldozer"])
+        for line in render([record]):
+            print(line, file=self.out or sys.stdout)
+
+    def close(self):
+        pass
+
+
+def trace_path(path, replication=None):
+    # у каждой реплики свой файл журнала: trace.bin -> trace.r0003.bin
+    if replication is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.r{replication:04d}{ext}"
+
+
+def make_tracer(params, replication=None):
+    # trace_file — двоичный журнал в файле (для реплики — trace_path); trace_buffer — кольцо
+    # в памяти; tracing — печать текста по ходу прогона; иначе трассировка выключена (None)
+    if params.get("trace_file"):
+        path = trace_path(params["trace_file"], replication)
+        return TraceLog(params.get("trace_capacity", 1 << 20), path=path)
+    if params.get("trace_buffer"):
+        return TraceLog(params["trace_buffer"])
+    if params.get("tracing"):
+        return TextTrace()
+    return None
+
+
+# ------------------------ ЧТЕНИЕ ------------------------
+def iter_records(buffer):
+    magic, capacity, count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("not a simulation trace")
+    data = memoryview(buffer)[HEADER.size : HEADER.size + capacity * RECORD.size]
+    n = min(count, capacity)
+    start = count % capacity if count > capacity else 0
+    # самые старые записи начинаются с позиции start
+    for i in range(n):
+        yield RECORD.unpack_from(data, ((start + i) % capacity) * RECORD.size)
+
+
+def read_trace(path):
+    with open(path, "rb") as f:
+        return list(iter_records(f.read()))
+
+
+def render(records):
+    for t, kind, order, value, trucks, loaders, bulldozer in records:
+        yield f"[{t:.1f}] " + MESSAGES[kind].format(order=order, value=value)
+        if kind in WITH_STATE:
+            yield f"[{t:.1f}] " + STATE_MESSAGE.format(trucks=trucks, loaders=loaders, bulldozer=bulldozer)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python tracelog.py TRACE_FILE", file=sys.stderr)
+        return 2
+    for line in render(read_trace(argv[0])):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,119 @@
-#
-# from typing import Optional
-# from dataclasses import dataclass
-# @dataclass
-# class Truck:
-#     id: int
-#     state: str = "empty"  # empty, waiting, loading, traveling, unloading, returning
-#     last_loaded_time: Optional[float] = None
-#     total_cycles: int = 0
-#     cycle_start_time: Optional[float] = None
\ No newline at end of file
+import math
+from array import array
+from collections import deque
+
+# ------------------------ ТЕХНИКА ПОШТУЧНО ------------------------
+# Вместо объекта на каждый самосвал — «структура массивов»: одно поле = один array,
+# номер единицы = индекс. Память ~60 байт на единицу, без словарей и сборщика мусора;
+# свободные единицы лежат в очереди простаивающих, выдача и возврат — O(1).
+
+# состояния самосвала: простой -> погрузка -> в пути -> разгрузка -> простой (цикл)
+TRUCK_STATES = ("idle", "loading", "traveling", "unloading")
+# состояния экскаватора-погрузчика
+LOADER_STATES = ("idle", "loading")
+IDLE, LOADING, TRAVELING, UNLOADING = 0, 1, 2, 3
+
+
+def _filled(typecode, n, value):
+    return array(typecode, [value]) * n
+
+
+class Fleet:
+    def __init__(self, n, states, t=0.0):
+        self.n = n
+        self.states = states
+        k = len(states)
+        self.state = _filled("b", n, IDLE)
+        self.order = _filled("q", n, -1)  # текущий заказ (-1 — нет)
+        self.since = _filled("d", n, t)  # момент входа в текущее состояние
+        self.cycle_start = _filled("d", n, math.nan)
+        self.cycles = _filled("q", n, 0)
+        self.cycle_time = _filled("d", n, 0.0)  # суммарная длительность завершённых циклов
+        self.residency = _filled("d", n * k, 0.0)  # время в состоянии s: residency[i * k + s]
+        self.idle_spells = _filled("q", n, 0)
+        self.max_idle = _filled("d", n, 0.0)
+        # простаивающие единицы в порядке освобождения: выдаётся дольше всех стоявшая
+        self.pool = deque(range(n))
+        self.start_time = t
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def available(self):
+        return len(self.pool)
+
+    def _enter(self, i, state, t):
+        k = len(self.states)
+        self.residency[i * k + self.state[i]] += t - self.since[i]
+        self.state[i] = state
+        self.since[i] = t
+
+    def acquire(self, t, state, order_id=-1):
+        # следующая свободная единица -> state; начало цикла
+        i = self.pool.popleft()
+        spell = t - self.since[i]
+        if spell > 0:
+            self.idle_spells[i] += 1
+            if spell > self.max_idle[i]:
+                self.max_idle[i] = spell
+        self._enter(i, state, t)
+        self.order[i] = order_id
+        self.cycle_start[i] = t
+        return i
+
+    def set_state(self, i, state, t):
+        self._enter(i, state, t)
+
+    def release(self, i, t):
+        # конец цикла: единица возвращается в очередь простаивающих
+        self._enter(i, IDLE, t)
+        self.order[i] = -1
+        self.cycles[i] += 1
+        self.cycle_time[i] += t - self.cycle_start[i]
+        self.cycle_start[i] = math.nan
+        self.pool.append(i)
+
+    def flush(self, t):
+        # довести накопленное время всех единиц до момента t (перед отчётом)
+        for i in range(self.n):
+            self._enter(i, self.state[i], t)
+
+    def reset_statistics(self, t):
+        # конец прогрева: состояние единиц остаётся, накопленное обнуляется
+        self.flush(t)
+        k = len(self.states)
+        self.residency = _filled("d", self.n * k, 0.0)
+        self.cycles = _filled("q", self.n, 0)
+        self.cycle_time = _filled("d", self.n, 0.0)
+        self.idle_spells = _filled("q", self.n, 0)
+        self.max_idle = _filled("d", self.n, 0.0)
+        self.start_time = t
+
+    def residency_of(self, i):
+        k = len(self.states)
+        return dict(zip(self.states, self.residency[i * k : i * k + k]))
+
+    def utilization(self, t):
+        # доля времени не в простое по каждой единице за [start_time, t]
+        self.flush(t)
+        k = len(self.states)
+        total = t - self.start_time
+        if total <= 0:
+            return [math.nan] * self.n
+        return [1.0 - self.residency[i * k + IDLE] / total for i in range(self.n)]
+
+    def summary(self, t):
+        util = self.utilization(t)
+        k = len(self.states)
+        cycles = sum(self.cycles)
+        return {
+            "n": self.n,
+            "utilization": util,
+            "cycles": list(self.cycles),
+            "mean_cycle_time": [ct / c if c else math.nan for c, ct in zip(self.cycles, self.cycle_time)],
+            "fleet_mean_cycle_time": sum(self.cycle_time) / cycles if cycles else math.nan,
+            "residency": {s: list(self.residency[j::k]) for j, s in enumerate(self.states)},
+            "idle_spells": list(self.idle_spells),
+            "max_idle": list(self.max_idle),
+        }
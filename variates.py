@@ -0,0 +1,66 @@
+import numpy as np
+
+# ------------------------ ПОТОКИ СЛУЧАЙНЫХ ВЕЛИЧИН ------------------------
+# У каждого вида активности свой поток. Поток заранее разыгрывает блок величин numpy
+# и отдаёт их по одной (обычные float), следующий блок — по мере надобности.
+# Зерно потока зависит только от (главное зерно, номер реплики, активность), а потоки
+# выдают «единичные» величины, которые масштабируются параметром на месте (mean * E).
+# Поэтому при одном главном зерне реплика i в разных сценариях получает те же
+# случайные числа по каждой активности (общие случайные числа, CRN).
+
+ACTIVITIES = ("heap_formation", "loading", "travel", "order_size", "interarrival")
+
+
+class VariateStream:
+    def __init__(self, seed_seq, draw, block=4096):
+        self._rng = np.random.default_rng(seed_seq)
+        self._draw = draw
+        self.block = block
+        # блоки растут от малого до block: короткие прогоны не разыгрывают лишнего
+        self._size = min(64, block)
+        self._it = iter(())
+
+    def _refill(self):
+        # итератор по списку: выдача одной величины без Python-кода на вызов, и он же
+        # сохраняет позицию в блоке при копировании/сериализации потока (снимки)
+        self._it = iter(self._draw(self._rng, self._size).tolist())
+        self._size = min(2 * self._size, self.block)
+
+    def __call__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            self._refill()
+            return next(self._it)
+
+
+def _standard_exponential(rng, n):
+    return rng.standard_exponential(n)
+
+
+def _uniform(rng, n):
+    return rng.random(n)
+
+
+class VariateStreams:
+    def __init__(self, master_seed, replication=0, block=4096):
+        # replication=None — отдельные потоки прогрева (snapshot.warm_up): ключ из одного
+        # числа не совпадает с ключами реплик (номер реплики, активность)
+        self.master_seed = master_seed
+        self.replication = replication
+        self.streams = {}
+        for i, name in enumerate(ACTIVITIES):
+            key = (i,) if replication is None else (replication, i)
+            seq = np.random.SeedSequence(master_seed, spawn_key=key)
+            draw = _uniform if name == "order_size" else _standard_exponential
+            self.streams[name] = VariateStream(seq, draw, block)
+
+    def expo(self, activity, mean):
+        return mean * self.streams[activity]()
+
+    def randint(self, activity, lo, hi):
+        # целое из [lo, hi] по равномерной величине потока
+        return lo + int(self.streams[activity]() * (hi - lo + 1))
+
+    def __getitem__(self, activity):
+        return self.streams[activity]
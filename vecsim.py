@@ -0,0 +1,236 @@
+import numpy as np
+
+from simulator import UNLOAD_TIME, resources_from_params
+
+# ------------------------ ПОШАГОВЫЙ ВЕКТОРНЫЙ ДВИЖОК ------------------------
+# Та же модель, что и Simulation, но для R реплик сразу. Состояние каждой реплики —
+# строка numpy-массивов, а список будущих событий фиксирован: следующее поступление
+# заказа, по одному событию на бульдозер и по одному на самосвал (его состояние
+# определяет тип события). На каждом шаге каждая живая реплика обрабатывает своё
+# ближайшее событие; разные типы событий обрабатываются масками.
+#
+# Отличие от Simulation только в порядке одновременных событий (у Simulation — порядок
+# планирования), поэтому результаты совпадают статистически, а не побитово.
+
+IDLE, LOADING, TRAVELING, UNLOADING = 0, 1, 2, 3
+
+
+class LockstepSimulation:
+    def __init__(self, params, n_replications, seed=None, resources=None):
+        self.params = params
+        self.R = n_replications
+        self.rng = np.random.default_rng(seed)
+        res = resources_from_params(params)
+        res.update(resources or {})
+        self.resources = res
+        self.n_bulldozers = res["bulldozer"]
+        self.n_loaders = res["loaders"]
+        self.n_trucks = res["trucks"]
+        self.max_orders = params["MAX_ORDERS"]
+
+        R, M, B, T = self.R, self.max_orders, self.n_bulldozers, self.n_trucks
+        self.t = np.zeros(R)
+        self.running = np.ones(R, dtype=bool)
+        self.stopped = np.zeros(R, dtype=bool)
+        self.heaps = np.zeros(R, dtype=np.int64)
+
+        self.n_orders = np.zeros(R, dtype=np.int64)
+        self.next_arrival = np.zeros(R)  # первый заказ — в момент 0
+        self.required = np.zeros((R, M), dtype=np.int64)
+        self.done = np.zeros((R, M), dtype=np.int64)
+        self.start = np.zeros((R, M))
+        self.pending = np.zeros((R, M), dtype=bool)
+
+        # бульдозеры всегда заняты: сразу после готовности кучи начинается следующая
+        self.bulldozer_t = self._exp(params["heap_formation_mean"], (R, B))
+
+        self.truck_state = np.zeros((R, T), dtype=np.int8)
+        self.truck_t = np.full((R, T), np.inf)
+        self.truck_order = np.zeros((R, T), dtype=np.int64)
+        self.loaders_busy = np.zeros(R, dtype=np.int64)
+        self.trucks_busy = np.zeros(R, dtype=np.int64)
+
+        self.delivered = np.zeros(R, dtype=np.int64)
+        self.trips = np.zeros(R, dtype=np.int64)
+        self.completed = np.zeros(R, dtype=np.int64)
+        self.prep_sum = np.zeros(R)
+        self.area = {r: np.zeros(R) for r in ("bulldozer", "loaders", "trucks")}
+        self.steps = 0
+
+    # ------------------------ СЛУЧАЙНЫЕ ВЕЛИЧИНЫ ------------------------
+    def _exp(self, mean, size):
+        return self.rng.exponential(mean, size)
+
+    def _duration(self, key, stochastic_key, size):
+        if self.params[stochastic_key]:
+            return self._exp(self.params[key], size)
+        return np.full(size, float(self.params[key]))
+
+    # ------------------------ ПРОГОН ------------------------
+    def run(self):
+        p = self.params
+        sim_time = float(p["SIM_TIME"])
+        B = self.n_bulldozers
+        rows_all = np.arange(self.R)
+
+        while True:
+            # как в Simulation: пока текущее время < SIM_TIME, обрабатывается следующее
+            # событие (даже если оно позже SIM_TIME); завершившиеся реплики досчитывают
+            # занятость до SIM_TIME
+            times = np.concatenate([self.next_arrival[:, None], self.bulldozer_t, self.truck_t], axis=1)
+            col = times.argmin(axis=1)
+            t_next = times[rows_all, col]
+            active = self.running & ~self.stopped & (self.t < sim_time) & np.isfinite(t_next)
+            finished = self.running & ~active
+            if finished.any():
+                self._integrate(finished, np.maximum(self.t[finished], sim_time))
+                self.running &= ~finished
+            if not active.any():
+                break
+            self.steps += 1
+
+            self._integrate(active, t_next[active])
+            col = np.where(active, col, -1)
+            retry = np.zeros(self.R, dtype=bool)
+
+            # поступление заказа
+            rows = np.flatnonzero(col == 0)
+            if rows.size:
+                self._order_arrival(rows)
+                retry[rows] = True
+
+            # куча готова, бульдозер сразу начинает следующую
+            mask = (col >= 1) & (col <= B)
+            rows = np.flatnonzero(mask)
+            if rows.size:
+                self.heaps[rows] += 1
+                self.bulldozer_t[rows, col[rows] - 1] = self.t[rows] + self._exp(p["heap_formation_mean"], rows.size)
+                retry[rows] = True
+
+            # события самосвалов
+            rows = np.flatnonzero(col > B)
+            if rows.size:
+                slots = col[rows] - 1 - B
+                state = self.truck_state[rows, slots]
+                self._loading_done(rows[state == LOADING], slots[state == LOADING])
+                self._truck_arrive(rows[state == TRAVELING], slots[state == TRAVELING])
+                back = state == UNLOADING
+                retry[self._truck_return(rows[back], slots[back])] = True
+
+            retry &= ~self.stopped
+            if retry.any():
+                self._try_loading(np.flatnonzero(retry))
+
+        return self.results()
+
+    def _integrate(self, mask, t_new):
+        dt = t_new - self.t[mask]
+        self.area["bulldozer"][mask] += self.n_bulldozers * dt
+        self.area["loaders"][mask] += self.loaders_busy[mask] * dt
+        self.area["trucks"][mask] += self.trucks_busy[mask] * dt
+        self.t[mask] = t_new
+
+    def _order_arrival(self, rows):
+        idx = self.n_orders[rows]
+        self.required[rows, idx] = self.rng.integers(3, 8, rows.size)
+        self.start[rows, idx] = self.t[rows]
+        self.pending[rows, idx] = True
+        self.n_orders[rows] += 1
+        more = self.n_orders[rows] < self.max_orders
+        nxt = self.t[rows] + self._exp(self.params["order_interarrival_mean"], rows.size)
+        self.next_arrival[rows] = np.where(more, nxt, np.inf)
+
+    def _loading_done(self, rows, slots):
+        if not rows.size:
+            return
+        self.loaders_busy[rows] -= 1
+        self.truck_state[rows, slots] = TRAVELING
+        travel = self._duration("travel_time_mean", "stochastic_travel", rows.size)
+        self.truck_t[rows, slots] = self.t[rows] + travel
+
+    def _truck_arrive(self, rows, slots):
+        if not rows.size:
+            return
+        self.delivered[rows] += 2
+        self.truck_state[rows, slots] = UNLOADING
+        self.truck_t[rows, slots] = self.t[rows] + UNLOAD_TIME
+
+    def _truck_return(self, rows, slots):
+        if not rows.size:
+            return rows
+        self.truck_state[rows, slots] = IDLE
+        self.truck_t[rows, slots] = np.inf
+        self.trucks_busy[rows] -= 1
+        self.delivered[rows] += 2
+        self.trips[rows] += 1
+
+        orders = self.truck_order[rows, slots]
+        live = self.pending[rows, orders]
+        rows_o, orders = rows[live], orders[live]
+        self.done[rows_o, orders] += 2
+        complete = self.done[rows_o, orders] >= self.required[rows_o, orders]
+        rows_c, orders_c = rows_o[complete], orders[complete]
+        self.pending[rows_c, orders_c] = False
+        self.completed[rows_c] += 1
+        self.prep_sum[rows_c] += self.t[rows_c] - self.start[rows_c, orders_c]
+
+        # достигнуто нужное число выполненных заказов — реплика останавливается
+        stop = rows_c[self.completed[rows_c] >= self.max_orders]
+        self.stopped[stop] = True
+        return rows
+
+    def _try_loading(self, rows):
+        p = self.params
+        while rows.size:
+            ok = (
+                (self.loaders_busy[rows] < self.n_loaders)
+                & (self.trucks_busy[rows] < self.n_trucks)
+                & (self.heaps[rows] >= 2)
+                & self.pending[rows].any(axis=1)
+            )
+            rows = rows[ok]
+            if not rows.size:
+                break
+            # первый свободный самосвал и самый ранний незавершённый заказ (FIFO)
+            slots = (self.truck_state[rows] == IDLE).argmax(axis=1)
+            orders = self.pending[rows].argmax(axis=1)
+            self.loaders_busy[rows] += 1
+            self.trucks_busy[rows] += 1
+            self.heaps[rows] -= 2
+            load = self._duration("loading_time_mean", "stochastic_loading", rows.size)
+            self.truck_state[rows, slots] = LOADING
+            self.truck_t[rows, slots] = self.t[rows] + load
+            self.truck_order[rows, slots] = orders
+
+    # ------------------------ РЕЗУЛЬТАТЫ ------------------------
+    def results(self):
+        sim_time = float(self.params["SIM_TIME"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            prep_mean = np.where(self.completed > 0, self.prep_sum / self.completed, np.nan)
+        return {
+            "delivered_heaps": self.delivered,
+            "trips": self.trips,
+            "orders_completed": self.completed,
+            "avg_prep_time_mean": prep_mean,
+            "utilization": {r: self.area[r] / (self.resources[r] * sim_time) for r in self.area},
+        }
+
+
+def run_lockstep(params, n_replications=None, seed=None):
+    n = params["N_REPLICATIONS"] if n_replications is None else n_replications
+    return LockstepSimulation(params, n, seed=seed).run()
+
+
+def to_runs(results):
+    # массивы по репликам -> список словарей как у Simulation.stats (без рядов)
+    util = results["utilization"]
+    return [
+        {
+            "delivered_heaps": int(results["delivered_heaps"][i]),
+            "trips": int(results["trips"][i]),
+            "orders_completed": int(results["orders_completed"][i]),
+            "avg_prep_time_mean": float(results["avg_prep_time_mean"][i]),
+            "utilization": {r: float(util[r][i]) for r in util},
+        }
+        for i in range(len(results["trips"]))
+    ]